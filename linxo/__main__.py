@@ -0,0 +1,75 @@
+# -*- encoding: utf-8 -*-
+
+"""
+Command line interface::
+
+    python -m linxo export --output ./export --format csv --workers 8
+"""
+
+import argparse
+import logging
+import sys
+
+from .client import Client, ENDPOINTS
+from .exceptions import APIError
+from .export import Exporter, FORMATS
+
+
+def export(client, args):
+    params = {}
+    if args.start_date:
+        params['start_date'] = args.start_date
+    if args.end_date:
+        params['end_date'] = args.end_date
+
+    exporter = Exporter(client, args.output, format=args.format,
+                        workers=args.workers, page_size=args.page_size,
+                        report_interval=args.report_interval, params=params)
+    exporter.run()
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog='linxo', description='Linxo API client')
+    parser.add_argument('--endpoint', choices=sorted(ENDPOINTS),
+                        help='API endpoint, defaults to the configuration one')
+    parser.add_argument('--config', help='configuration file to use')
+    parser.add_argument('--debug', action='store_true', help='verbose logging')
+    commands = parser.add_subparsers(dest='command')
+    commands.required = True
+
+    command = commands.add_parser(
+        'export', help='export accounts and transactions, resuming if interrupted')
+    command.add_argument('--output', required=True, help='output directory')
+    command.add_argument('--format', choices=sorted(FORMATS), default='jsonl')
+    command.add_argument('--workers', type=int, default=4,
+                         help='accounts exported in parallel')
+    command.add_argument('--page-size', type=int, default=100)
+    command.add_argument('--report-interval', type=float, default=10,
+                         help='seconds between progress reports')
+    command.add_argument('--start-date', help='only export transactions after this date')
+    command.add_argument('--end-date', help='only export transactions before this date')
+    command.set_defaults(func=export)
+
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    logging.basicConfig(level=logging.DEBUG if args.debug else logging.INFO,
+                        format='%(asctime)s %(levelname)s %(message)s')
+
+    client = Client(endpoint=args.endpoint, config_file=args.config,
+                    debug=args.debug)
+    try:
+        args.func(client, args)
+    except APIError as error:
+        logging.error('%s', error)
+        return 1
+    except KeyboardInterrupt:
+        logging.warning('Interrupted, run the same command again to resume')
+        return 130
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
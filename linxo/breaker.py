@@ -0,0 +1,176 @@
+# -*- encoding: utf-8 -*-
+
+"""
+Circuit breaker failing fast while the Linxo API is degraded.
+
+Each endpoint and path template (``/accounts/{account_id}/transactions``) gets its own
+circuit. A circuit *opens* after ``failure_threshold`` consecutive failures:
+calls then raise :py:class:`linxo.exceptions.CircuitOpenError` without reaching
+the network. After ``reset_timeout`` seconds, the circuit is *half open* and
+lets ``half_open_calls`` probe requests through: a successful probe closes it,
+a failed one opens it again. Only probes change the state of a half open
+circuit: outcomes of calls sent before it opened are ignored.
+
+A call fails when the request itself fails (network error, timeout, invalid
+response), when the API answers with a 5xx status, or when it takes longer than
+``latency_threshold`` seconds. Other API errors (404, 403, ...) mean the API is
+up and count as successes.
+"""
+
+import threading
+from contextlib import contextmanager
+
+try:
+    from time import monotonic
+except ImportError:  # pragma: no cover
+    # Python 2
+    from time import time as monotonic
+
+from .exceptions import (
+    APIError, CircuitOpenError, DeadlineExceeded, HTTPError, InvalidResponse,
+    NetworkError,
+)
+
+#: Circuit states
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class Circuit(object):
+    '''
+    State of a single endpoint and path template.
+
+    ``generation`` changes with every state change. Each call is admitted with
+    a ticket holding the generation and whether it is a probe, so that calls
+    admitted before the circuit opened cannot close it when they finish late.
+    '''
+    def __init__(self, name, breaker):
+        self.name = name
+        self.breaker = breaker
+        self.state = CLOSED
+        self.generation = 0
+        self.failures = 0
+        self.opened_at = None
+        self.probes = 0
+
+    def _set_state(self, state):
+        self.state = state
+        self.generation += 1
+        self.failures = 0
+        self.probes = 0
+
+    def before(self):
+        """
+        Raise :py:class:`CircuitOpenError` if the call must not be sent,
+        otherwise return its ``(generation, probe)`` ticket.
+        """
+        breaker = self.breaker
+        if self.state == OPEN:
+            if monotonic() - self.opened_at < breaker.reset_timeout:
+                raise CircuitOpenError('Circuit {0} is open'.format(self.name))
+            self._set_state(HALF_OPEN)
+
+        if self.state == HALF_OPEN:
+            if self.probes >= breaker.half_open_calls:
+                raise CircuitOpenError('Circuit {0} is half open'.format(self.name))
+            self.probes += 1
+            return self.generation, True
+        return self.generation, False
+
+    def success(self, ticket):
+        generation, probe = ticket
+        if generation != self.generation:
+            return
+        if probe:
+            self._set_state(CLOSED)
+        else:
+            self.failures = 0
+
+    def failure(self, ticket):
+        generation, probe = ticket
+        if generation != self.generation:
+            return
+        self.failures += 1
+        if probe or self.failures >= self.breaker.failure_threshold:
+            self._set_state(OPEN)
+            self.opened_at = monotonic()
+
+    def release(self, ticket):
+        """Give back the probe slot of ``ticket`` without changing the state."""
+        generation, probe = ticket
+        if probe and generation == self.generation:
+            self.probes -= 1
+
+
+class CircuitBreaker(object):
+    '''
+    Set of circuits, which can be shared between clients and threads.
+
+    :param int failure_threshold: consecutive failures opening a circuit
+    :param float latency_threshold: calls slower than this many seconds are
+        failures. ``None`` disables the check.
+    :param float reset_timeout: seconds before an open circuit is probed
+    :param int half_open_calls: concurrent probe calls of a half open circuit
+    '''
+    def __init__(self, failure_threshold=5, latency_threshold=None,
+                 reset_timeout=30, half_open_calls=1):
+        self.failure_threshold = failure_threshold
+        self.latency_threshold = latency_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_calls = half_open_calls
+
+        self._lock = threading.Lock()
+        self._circuits = {}
+
+    def circuit(self, endpoint, template):
+        """Return the circuit of ``endpoint`` and path ``template``."""
+        key = (endpoint, template)
+        with self._lock:
+            circuit = self._circuits.get(key)
+            if circuit is None:
+                circuit = Circuit('{0} {1}'.format(endpoint, template), self)
+                self._circuits[key] = circuit
+            return circuit
+
+    def is_failure(self, error):
+        """Whether ``error`` means the upstream API is degraded."""
+        if isinstance(error, (HTTPError, InvalidResponse, NetworkError)):
+            return True
+        response = getattr(error, 'response', None)
+        status = getattr(response, 'status_code', None)
+        return isinstance(status, int) and status >= 500
+
+    @contextmanager
+    def guard(self, endpoint, template):
+        """Context manager running a call through the matching circuit."""
+        circuit = self.circuit(endpoint, template)
+        with self._lock:
+            ticket = circuit.before()
+
+        start = monotonic()
+        try:
+            yield circuit
+        except DeadlineExceeded:
+            # Our own budget ran out, which says nothing about the API
+            with self._lock:
+                circuit.release(ticket)
+            raise
+        except APIError as error:
+            with self._lock:
+                if self.is_failure(error):
+                    circuit.failure(ticket)
+                else:
+                    circuit.success(ticket)
+            raise
+        except Exception:
+            with self._lock:
+                circuit.release(ticket)
+            raise
+
+        elapsed = monotonic() - start
+        with self._lock:
+            if self.latency_threshold is not None and elapsed > self.latency_threshold:
+                circuit.failure(ticket)
+            else:
+                circuit.success(ticket)
@@ -0,0 +1,160 @@
+# -*- encoding: utf-8 -*-
+
+"""
+Run many write operations with bounded concurrency.
+
+Operations sharing a ``key`` run one after the other, in the order they were
+given, while operations with different keys (or no key) run concurrently.
+Once an operation fails, the following operations of the same key are skipped::
+
+    from linxo.bulk import Operation
+
+    report = client.bulk([
+        Operation('POST', '/users', {'email': 'jane@example.com'}, key='jane'),
+        Operation('PUT', '/users/jane', {'firstname': 'Jane'}, key='jane'),
+        Operation('DELETE', '/accounts/1234'),
+    ], max_in_flight=16)
+
+    for item in report.failures:
+        print(item.operation, item.error)
+
+Operations are consumed lazily from the iterable: at most ``max_in_flight``
+operations are running or waiting for their key at any time.
+"""
+
+import collections
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from . import deadline
+from .exceptions import APIError
+
+#: Item status in a :py:class:`BulkReport`
+SUCCESS = 'success'
+FAILED = 'failed'
+SKIPPED = 'skipped'
+
+#: Write operation. Operations with the same ``key`` run sequentially.
+Operation = collections.namedtuple('Operation', 'method path data key')
+Operation.__new__.__defaults__ = (None, None)
+
+#: Outcome of the operation at position ``index``. ``result`` is the decoded
+#: API response, ``error`` the :py:class:`APIError` of a failed operation, or
+#: of the failed operation of the same key which caused it to be skipped.
+ItemResult = collections.namedtuple('ItemResult', 'index operation status result error')
+
+
+class BulkReport(object):
+    '''
+    Outcome of every operation of a bulk run, in operation order.
+    '''
+    def __init__(self, items):
+        self.items = sorted(items, key=lambda item: item.index)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def _with_status(self, status):
+        return [item for item in self.items if item.status == status]
+
+    @property
+    def successes(self):
+        return self._with_status(SUCCESS)
+
+    @property
+    def failures(self):
+        return self._with_status(FAILED)
+
+    @property
+    def skipped(self):
+        return self._with_status(SKIPPED)
+
+    @property
+    def ok(self):
+        return all(item.status == SUCCESS for item in self.items)
+
+
+class BulkWriter(object):
+    '''
+    Run write operations through ``client``.
+
+    :param client: :py:class:`linxo.client.Client` to use, shared by threads
+    :param int max_in_flight: maximum number of concurrent API requests
+    '''
+    def __init__(self, client, max_in_flight=8):
+        self.client = client
+        self.max_in_flight = max_in_flight
+
+    def run(self, operations):
+        """Run ``operations``, return a :py:class:`BulkReport`."""
+        lock = threading.Lock()
+        slots = threading.BoundedSemaphore(self.max_in_flight)
+        chains = {}
+        failed = {}
+        items = []
+
+        def execute(index, operation):
+            if operation.key is not None and operation.key in failed:
+                return ItemResult(index, operation, SKIPPED, None, failed[operation.key])
+            try:
+                result = self.client.call(operation.method, operation.path, operation.data)
+            except APIError as error:
+                if operation.key is not None:
+                    with lock:
+                        failed.setdefault(operation.key, error)
+                return ItemResult(index, operation, FAILED, None, error)
+            return ItemResult(index, operation, SUCCESS, result, None)
+
+        def chain(key):
+            """Run queued operations of ``key`` until there are none left."""
+            while True:
+                with lock:
+                    queue = chains[key]
+                    if not queue:
+                        del chains[key]
+                        return
+                    index, operation = queue.popleft()
+                try:
+                    item = execute(index, operation)
+                except Exception:
+                    # Do not leave the producer waiting for queued operations
+                    with lock:
+                        queue = chains.pop(key)
+                    for _ in range(len(queue) + 1):
+                        slots.release()
+                    raise
+                with lock:
+                    items.append(item)
+                slots.release()
+
+        active = deadline.current()
+        if active is not None:
+            chain = active.wrap(chain)
+
+        executor = ThreadPoolExecutor(max_workers=self.max_in_flight)
+        futures = []
+        try:
+            for index, operation in enumerate(operations):
+                if not isinstance(operation, Operation):
+                    operation = Operation(*operation)
+                slots.acquire()
+
+                # Operations without key get a chain of their own
+                key = operation.key if operation.key is not None else (None, index)
+                with lock:
+                    if key in chains:
+                        chains[key].append((index, operation))
+                        continue
+                    chains[key] = collections.deque([(index, operation)])
+                futures.append(executor.submit(chain, key))
+        finally:
+            executor.shutdown(wait=True)
+
+        # Surface unexpected errors from the worker threads
+        for future in futures:
+            future.result()
+
+        return BulkReport(items)
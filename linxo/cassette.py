@@ -0,0 +1,221 @@
+# -*- encoding: utf-8 -*-
+
+"""
+Record and replay HTTP interactions of a :py:class:`linxo.client.Client`.
+
+A cassette is mounted as a transport adapter on the client session, so it sees
+every request, including the OAuth token refreshes performed by the session
+itself. Interactions are stored as gzip compressed JSON lines::
+
+    from linxo import Client
+    from linxo.cassette import Cassette
+
+    # record real traffic
+    with Cassette('sync.cassette', mode='record') as cassette:
+        client = Client(cassette=cassette)
+        client.get('/accounts')
+
+    # replay it offline, sleeping as long as the real requests took
+    client = Client(cassette=Cassette('sync.cassette', latency=1.0))
+    client.get('/accounts')
+
+Replayed requests are matched on method and URL, in recorded order. Request
+headers and bodies are never written to disk, but responses are: a cassette
+recorded against a real account contains tokens and banking data.
+
+The file is compact but not indexed: gzip streams cannot be read from an
+arbitrary offset, so a replayed cassette is read once and indexed by method
+and URL in memory. Keep cassettes to the size of a test scenario.
+"""
+
+import base64
+import collections
+import gzip
+import io
+import json
+import threading
+from datetime import timedelta
+from time import sleep, time
+
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from .exceptions import CassetteError
+
+#: Version of the on-disk format
+CASSETTE_VERSION = 1
+
+#: Cassette modes
+RECORD = 'record'
+REPLAY = 'replay'
+
+#: Response headers describing the transfer, not the (decoded) stored body
+SKIPPED_HEADERS = ('content-encoding', 'content-length', 'transfer-encoding')
+
+
+def _key(method, url):
+    return '{0} {1}'.format(method.upper(), url)
+
+
+class Cassette(object):
+    '''
+    Set of recorded HTTP interactions, stored in ``path``.
+
+    :param str path: cassette file
+    :param str mode: ``'record'`` to capture live traffic (the file is
+        overwritten) or ``'replay'`` to serve responses from the file
+    :param float latency: when replaying, sleep ``latency`` times the recorded
+        request duration before answering. ``0`` answers immediately.
+    '''
+    def __init__(self, path, mode=REPLAY, latency=0):
+        if mode not in (RECORD, REPLAY):
+            raise CassetteError('Unknown cassette mode {0}'.format(mode))
+        self.path = path
+        self.mode = mode
+        self.latency = latency
+
+        self._lock = threading.Lock()
+        self._file = None
+        self._closed = False
+        self._index = collections.defaultdict(collections.deque)
+
+        if mode == REPLAY:
+            self._load()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def replaying(self):
+        return self.mode == REPLAY
+
+    def install(self, session):
+        """Mount the record or replay adapter on a requests ``session``."""
+        if self.replaying:
+            adapter = ReplayAdapter(self)
+        else:
+            adapter = RecordingAdapter(self)
+        for prefix in ('https://', 'http://'):
+            session.mount(prefix, adapter)
+
+    def close(self):
+        """
+        Flush and close the cassette file when recording. Recording more
+        interactions afterwards raises :py:class:`CassetteError`.
+        """
+        with self._lock:
+            self._closed = True
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _load(self):
+        try:
+            with gzip.open(self.path, 'rb') as f:
+                lines = io.TextIOWrapper(f, encoding='utf-8')
+                header = json.loads(next(lines, 'null'))
+                if not isinstance(header, dict) or header.get('version') != CASSETTE_VERSION:
+                    raise CassetteError('{0} is not a valid cassette'.format(self.path))
+                for line in lines:
+                    interaction = json.loads(line)
+                    key = _key(interaction['method'], interaction['url'])
+                    self._index[key].append(interaction)
+        except (EnvironmentError, EOFError, ValueError, KeyError, TypeError) as error:
+            raise CassetteError('Cannot load cassette {0}: {1}'.format(self.path, error))
+
+    def _write(self, record):
+        with self._lock:
+            if self._closed:
+                # Opening it again would overwrite the recording
+                raise CassetteError('Cassette {0} is closed'.format(self.path))
+            if self._file is None:
+                self._file = gzip.open(self.path, 'wb')
+                self._file.write(self._line({'version': CASSETTE_VERSION}))
+            self._file.write(self._line(record))
+            self._file.flush()
+
+    def _line(self, record):
+        line = json.dumps(record, separators=(',', ':'), sort_keys=True)
+        return (line + '\n').encode('utf-8')
+
+    def record(self, request, response, elapsed):
+        """Append the interaction ``request`` / ``response`` to the cassette."""
+        content = response.content or b''
+        try:
+            body, encoding = content.decode('utf-8'), 'utf-8'
+        except UnicodeDecodeError:
+            body, encoding = base64.b64encode(content).decode('ascii'), 'base64'
+
+        headers = dict((k, v) for k, v in response.headers.items()
+                       if k.lower() not in SKIPPED_HEADERS)
+
+        self._write({
+            'method': request.method.upper(),
+            'url': request.url,
+            'status': response.status_code,
+            'reason': response.reason,
+            'headers': headers,
+            'body': body,
+            'encoding': encoding,
+            'elapsed': round(elapsed, 6),
+        })
+
+    def play(self, request):
+        """Pop the next recorded interaction matching ``request``."""
+        key = _key(request.method, request.url)
+        with self._lock:
+            try:
+                return self._index[key].popleft()
+            except IndexError:
+                raise CassetteError('No recorded interaction left for {0}'.format(key))
+
+
+class RecordingAdapter(HTTPAdapter):
+    """Regular HTTP adapter saving each exchange to a :py:class:`Cassette`."""
+    def __init__(self, cassette, **kwargs):
+        self.cassette = cassette
+        super(RecordingAdapter, self).__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        start = time()
+        response = super(RecordingAdapter, self).send(request, **kwargs)
+        self.cassette.record(request, response, time() - start)
+        return response
+
+
+class ReplayAdapter(BaseAdapter):
+    """Adapter answering requests from a :py:class:`Cassette`, offline."""
+    def __init__(self, cassette):
+        self.cassette = cassette
+        super(ReplayAdapter, self).__init__()
+
+    def send(self, request, **kwargs):
+        interaction = self.cassette.play(request)
+
+        if self.cassette.latency:
+            sleep(interaction['elapsed'] * self.cassette.latency)
+
+        if interaction['encoding'] == 'base64':
+            content = base64.b64decode(interaction['body'])
+        else:
+            content = interaction['body'].encode('utf-8')
+
+        response = Response()
+        response.status_code = interaction['status']
+        response.reason = interaction['reason']
+        response.headers = CaseInsensitiveDict(interaction['headers'])
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        response.elapsed = timedelta(seconds=interaction['elapsed'])
+        response._content = content
+        return response
+
+    def close(self):
+        pass
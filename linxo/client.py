@@ -3,24 +3,40 @@ import logging
 import keyword
 import json
 import os
+import re
+import socket
+import threading
 from time import time
 
+try:
+    from time import monotonic
+except ImportError:  # pragma: no cover
+    # Python 2
+    from time import time as monotonic
+
 from builtins import input
+from requests import Request
+from requests.adapters import HTTPAdapter
 from requests_oauthlib import OAuth2Session
 from requests.exceptions import RequestException
+from urllib3.exceptions import HTTPError as ConnectionFailure
 
 from .exceptions import (
     APIError, InvalidEndpoint, HTTPError, InvalidResponse,
     AuthentificationFailed, InvalidCredentials, ResourceNotFoundError,
-    NetworkError,
+    NetworkError, DeadlineExceeded,
 )
 
 try:
     from urllib import urlencode
+    from urlparse import urlparse
 except ImportError:  # noqa
-    from urllib.parse import urlencode
+    from urllib.parse import urlencode, urlparse
 
+from .bulk import BulkWriter
 from .config import config
+from . import deadline
+from .endpoints import RESOURCES, match_template
 
 #: Mapping between Linxo API environnement
 ENDPOINTS = {
@@ -46,16 +62,53 @@ REDIRECT_URI = os.environ.get('LINXO_REDIRECT_URI',
                               'http://localhost:8012/callback')
 
 
+#: Path segments considered as resource identifiers
+ID_SEGMENT = re.compile(r'^(\d+|[0-9a-fA-F-]{16,})$')
+
+
 def get_code(text):
     """Wrapper for input so as to mock."""
     return input(text)
 
 
+def path_template(path):
+    """
+    Return the template of ``path`` in the API description, like
+    ``/accounts/{account_id}/transactions``. Paths which are not described
+    get their identifiers replaced by ``{id}``, for instance ``/users/{id}``.
+    """
+    path = path.split('?', 1)[0]
+    template = match_template(path)
+    if template is not None:
+        return template
+    return '/'.join('{id}' if ID_SEGMENT.match(segment) else segment
+                    for segment in path.split('/'))
+
+
 class Client(object):
     def __init__(self, endpoint=None, client_id=None, client_secret=None,
                  refresh_token=None, config_file=None, token_updater=None,
-                 timeout=TIMEOUT, debug=False):
-        """Creates a new Client. No credential check is done at this point."""
+                 timeout=TIMEOUT, debug=False, cassette=None,
+                 circuit_breaker=None, metrics=None, token_store=None):
+        """
+        Creates a new Client. No credential check is done at this point.
+
+        ``cassette`` is an optional :py:class:`linxo.cassette.Cassette` used to
+        record the HTTP traffic of the client, or to replay it offline.
+
+        ``circuit_breaker`` is an optional
+        :py:class:`linxo.breaker.CircuitBreaker`, which may be shared between
+        clients, to fail fast when the API is degraded.
+
+        ``metrics`` is an optional :py:class:`linxo.metrics.Metrics` counting
+        calls by path template.
+
+        ``token_store`` is an optional :py:class:`linxo.runner.SharedToken`,
+        sharing the token and its refreshes between processes.
+
+        Typed endpoint methods, such as ``client.accounts.list()``, are
+        described in :py:mod:`linxo.endpoints`.
+        """
         if config_file:
             config.read(config_file)
 
@@ -82,11 +135,22 @@ class Client(object):
         self._refresh_token = refresh_token
 
         if token_updater is None:
-            token_updater = self._save_token
+            if cassette is not None and cassette.replaying:
+                # Do not overwrite real credentials with recorded ones
+                token_updater = self._update_token
+            else:
+                token_updater = self._save_token
 
         # Override default timeout
         self._timeout = timeout
 
+        self.circuit_breaker = circuit_breaker
+        self.metrics = metrics
+        self.token_store = token_store
+
+        for name, resource in RESOURCES.items():
+            setattr(self, name, resource(self))
+
         self.token_url = self._endpoint['auth_url'] + '/token'
 
         # Refresh parameters
@@ -105,6 +169,10 @@ class Client(object):
                                           'expires_at': time() - 10,
                                       })
 
+        self.cassette = cassette
+        if cassette is not None:
+            cassette.install(self._session)
+
         self.debug = debug
 
     def _debug(self, data):
@@ -182,12 +250,103 @@ class Client(object):
 
         return final_url, state
 
-    def get(self, _target, **kwargs):
+    def warmup(self, connections=1, refresh_token=True):
+        """
+        Prepare the client for its first calls: resolve the API and auth
+        hosts, open ``connections`` TLS connections to the API (one to the
+        auth server) in the session pool, then refresh the access token if it
+        has expired. Return the time spent in each step, in seconds.
+        Errors are raised as :py:class:`linxo.exceptions.HTTPError`.
+
+        With a ``token_store``, the token is refreshed through it, so that
+        other processes sharing the token are not invalidated.
+        """
+        timings = {}
+        try:
+            for url, count in ((self._endpoint['api_url'], connections),
+                               (self._endpoint['auth_url'], 1)):
+                timings[url] = self._warmup_connections(url, count)
+
+            if refresh_token and self.token_store is not None:
+                start = monotonic()
+                self.token_store.ensure(self)
+                timings['token'] = monotonic() - start
+            elif refresh_token and self._session.token.get('expires_at', 0) < time() + 10:
+                start = monotonic()
+                # Same refresh as the one done by the session on expiry
+                token = self._session.refresh_token(self.token_url, timeout=self._timeout)
+                self._session.token_updater(token)
+                timings['token'] = monotonic() - start
+        except (RequestException, ConnectionFailure, socket.error) as error:
+            raise HTTPError("Warmup failed", error)
+
+        return timings
+
+    def warmup_async(self, connections=1, refresh_token=True):
+        """
+        Run :py:meth:`warmup` in a background thread, which is returned.
+        Failures are logged: the first calls will then warm up the client.
+        """
+        def run():
+            try:
+                self.warmup(connections, refresh_token)
+            except APIError:
+                logging.exception('Client warmup failed')
+
+        thread = threading.Thread(target=run)
+        thread.daemon = True
+        thread.start()
+        return thread
+
+    def _warmup_connections(self, url, count):
+        """Open up to ``count`` idle connections to ``url`` in the pool."""
+        adapter = self._session.get_adapter(url)
+        if not isinstance(adapter, HTTPAdapter):
+            # Replayed cassettes do not use the network
+            return 0
+
+        start = monotonic()
+        parsed = urlparse(url)
+        socket.getaddrinfo(parsed.hostname, parsed.port or 443, 0, socket.SOCK_STREAM)
+
+        # Make room for the connections in the pool
+        if adapter._pool_maxsize < count:
+            adapter.init_poolmanager(adapter._pool_connections, count,
+                                     block=adapter._pool_block)
+
+        request = Request('GET', url).prepare()
+        if hasattr(adapter, 'get_connection_with_tls_context'):
+            pool = adapter.get_connection_with_tls_context(
+                request, self._session.verify, cert=self._session.cert)
+        else:  # pragma: no cover
+            # requests < 2.32
+            pool = adapter.get_connection(url)
+
+        timeout = self._timeout
+        if isinstance(timeout, tuple):
+            timeout = timeout[0]
+
+        opened = []
+        try:
+            for _ in range(count):
+                conn = pool._get_conn()
+                opened.append(conn)
+                if conn.sock is None:
+                    conn.timeout = timeout
+                    conn.connect()
+        finally:
+            for conn in opened:
+                pool._put_conn(conn)
+
+        return monotonic() - start
+
+    def get(self, _target, _timeout=None, **kwargs):
         """
         'GET' :py:func:`Client.call` wrapper.
         Query string parameters can be set either directly in ``_target`` or as
         keywork arguments. If an argument collides with a Python reserved
         keyword, prefix it with a '_'. For instance, ``from`` becomes ``_from``.
+        ``_timeout`` overrides the client timeout for this call.
         """
         if kwargs:
             kwargs = self._canonicalize_kwargs(kwargs)
@@ -197,40 +356,83 @@ class Client(object):
             else:
                 _target = '%s?%s' % (_target, query_string)
 
-        return self.call('GET', _target, None)
+        return self.call('GET', _target, None, timeout=_timeout)
 
-    def put(self, _target, **kwargs):
+    def put(self, _target, _timeout=None, **kwargs):
         """
         'PUT' :py:func:`Client.call` wrapper
         Body parameters can be set either directly in ``_target`` or as keywork
         arguments. If an argument collides with a Python reserved keyword,
         prefix it with a '_'. For instance, ``from`` becomes ``_from``.
+        ``_timeout`` overrides the client timeout for this call.
         """
         kwargs = self._canonicalize_kwargs(kwargs)
-        return self.call('PUT', _target, kwargs)
+        return self.call('PUT', _target, kwargs, timeout=_timeout)
 
-    def post(self, _target, **kwargs):
+    def post(self, _target, _timeout=None, **kwargs):
         """
         'POST' :py:func:`Client.call` wrapper
         Body parameters can be set either directly in ``_target`` or as keywork
         arguments. If an argument collides with a Python reserved keyword,
         prefix it with a '_'. For instance, ``from`` becomes ``_from``.
+        ``_timeout`` overrides the client timeout for this call.
         """
         kwargs = self._canonicalize_kwargs(kwargs)
-        return self.call('POST', _target, kwargs)
+        return self.call('POST', _target, kwargs, timeout=_timeout)
 
-    def delete(self, _target):
+    def delete(self, _target, _timeout=None):
         """
         'DELETE' :py:func:`Client.call` wrapper
+        ``_timeout`` overrides the client timeout for this call.
+        """
+        return self.call('DELETE', _target, None, timeout=_timeout)
+
+    def bulk(self, operations, max_in_flight=8):
+        """
+        Run an iterable of :py:class:`linxo.bulk.Operation` concurrently and
+        return a :py:class:`linxo.bulk.BulkReport` of their outcomes.
+        Operations sharing a key run in order.
+        """
+        return BulkWriter(self, max_in_flight=max_in_flight).run(operations)
+
+    def call(self, method, path, data=None, timeout=None, template=None):
+        """
+        Low level call helper.
+        ``template`` labels the call in metrics and circuit breaker, it is
+        guessed from ``path`` when not given.
+        When the client has a circuit breaker, the call goes through the
+        circuit of its path template and may raise
+        :py:class:`linxo.exceptions.CircuitOpenError` without being sent.
         """
-        return self.call('DELETE', _target, None)
+        if self.circuit_breaker is None and self.metrics is None:
+            return self._call(method, path, data, timeout)
+
+        if template is None:
+            template = path_template(path)
 
-    def call(self, method, path, data=None):
-        """Low level call helper."""
+        start = monotonic()
+        error = None
+        try:
+            if self.circuit_breaker is None:
+                return self._call(method, path, data, timeout)
+            with self.circuit_breaker.guard(self.endpoint, template):
+                return self._call(method, path, data, timeout)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            if self.metrics is not None:
+                self.metrics.record(method, template, monotonic() - start, error)
+
+    def _call(self, method, path, data=None, timeout=None):
         # request
         try:
-            result = self.raw_call(method=method, path=path, data=data)
+            result = self.raw_call(method=method, path=path, data=data,
+                                   timeout=timeout)
         except RequestException as error:
+            active = deadline.current()
+            if active is not None and active.expired:
+                raise DeadlineExceeded("Deadline exceeded during request", error)
             raise HTTPError("Low HTTP request failed error", error)
 
         status = result.status_code
@@ -262,10 +464,30 @@ class Client(object):
         """Once a new token has been generate, save it to config file."""
         config.set(self.endpoint, 'refresh_token', token.get('refresh_token'))
         config.write()
+        self._update_token(token)
+
+    def _update_token(self, token):
+        """Use a new token for the following requests."""
         self._session.token = token
 
-    def raw_call(self, method, path, data=None):
-        """Lowest level call helper."""
+    def raw_call(self, method, path, data=None, timeout=None):
+        """
+        Lowest level call helper.
+        ``timeout`` overrides the client timeout. Under a
+        :py:class:`linxo.deadline.Deadline`, it is reduced to the remaining
+        budget and :py:class:`linxo.exceptions.DeadlineExceeded` is raised once
+        the deadline has expired.
+        """
+        if timeout is None:
+            timeout = self._timeout
+
+        active = deadline.current()
+        if active is not None:
+            # Checks and clips in one step, the budget may run out in between
+            timeout = active.clip(timeout)
+
+        if self.token_store is not None:
+            self.token_store.ensure(self)
 
         body = ''
         target = self._endpoint['api_url'] + path
@@ -277,6 +499,6 @@ class Client(object):
             body = json.dumps(data)
 
         r = self._session.request(method, target, headers=headers,
-                                  data=body, timeout=self._timeout)
+                                  data=body, timeout=timeout)
 
         return r
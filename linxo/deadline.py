@@ -0,0 +1,142 @@
+# -*- encoding: utf-8 -*-
+
+"""
+Time budget shared by several API calls.
+
+While a :py:class:`Deadline` is active, every request sent by a
+:py:class:`linxo.client.Client` from the same thread has its timeout reduced to
+the remaining budget. Once the budget is spent, or the deadline cancelled,
+calls raise :py:class:`linxo.exceptions.DeadlineExceeded` instead of being
+sent::
+
+    from linxo.deadline import Deadline
+
+    with Deadline(60):
+        accounts = client.get('/accounts')
+        for account in accounts:
+            client.get('/transactions', account_id=account['id'])
+
+Deadlines are bound to the thread which entered them. Use
+:py:meth:`Deadline.wrap` to run a function in another thread under the same
+deadline. Nested deadlines never extend the budget of the outer ones.
+"""
+
+import functools
+import threading
+import weakref
+
+try:
+    from time import monotonic
+except ImportError:  # pragma: no cover
+    # Python 2
+    from time import time as monotonic
+
+from .exceptions import DeadlineExceeded
+
+_local = threading.local()
+
+# Protects the children of every deadline
+_children_lock = threading.Lock()
+
+
+def current():
+    """Return the innermost active deadline of this thread, or ``None``."""
+    stack = getattr(_local, 'stack', None)
+    if stack:
+        return stack[-1]
+    return None
+
+
+class Deadline(object):
+    '''
+    Budget of ``timeout`` seconds, starting now.
+
+    :param float timeout: seconds before the deadline expires
+    '''
+    def __init__(self, timeout):
+        self.expires_at = monotonic() + timeout
+        self._cancelled = threading.Event()
+        self._children = weakref.WeakSet()
+        # Deadline active when this one is created, which may expire first
+        self._parent = current()
+        if self._parent is not None:
+            with _children_lock:
+                self._parent._children.add(self)
+            if self._parent.cancelled:
+                self._cancelled.set()
+
+    def __enter__(self):
+        stack = getattr(_local, 'stack', None)
+        if stack is None:
+            stack = _local.stack = []
+        stack.append(self)
+        return self
+
+    def __exit__(self, *exc):
+        _local.stack.pop()
+
+    def remaining(self):
+        """Seconds left, taking enclosing deadlines into account."""
+        remaining = self.expires_at - monotonic()
+        if self._parent is not None:
+            remaining = min(remaining, self._parent.remaining())
+        return max(remaining, 0)
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    @property
+    def expired(self):
+        if self.cancelled or (self._parent is not None and self._parent.expired):
+            return True
+        return self.expires_at <= monotonic()
+
+    def cancel(self):
+        """Make every following call under this deadline fail, from any thread."""
+        with _children_lock:
+            children = list(self._children)
+        self._cancelled.set()
+        for child in children:
+            child.cancel()
+
+    def sleep(self, seconds):
+        """
+        Sleep ``seconds``, or until the deadline is cancelled.
+        Return ``True`` if it was cancelled.
+        """
+        self._cancelled.wait(seconds)
+        return self.cancelled
+
+    def check(self):
+        """Raise :py:class:`DeadlineExceeded` if the deadline has expired."""
+        if self.expired:
+            raise DeadlineExceeded('Deadline exceeded or cancelled')
+
+    def clip(self, timeout):
+        """
+        Reduce a requests ``timeout``, either a number, ``None`` or a
+        ``(connect, read)`` tuple, to the remaining budget. Raise
+        :py:class:`DeadlineExceeded` when there is none left, requests not
+        accepting a timeout of ``0``.
+        """
+        remaining = self.remaining()
+        if remaining <= 0 or self.cancelled:
+            raise DeadlineExceeded('Deadline exceeded or cancelled')
+        if isinstance(timeout, tuple):
+            return tuple(remaining if t is None else min(t, remaining)
+                         for t in timeout)
+        if timeout is None:
+            return remaining
+        return min(timeout, remaining)
+
+    def wrap(self, function):
+        """Return ``function`` running under this deadline, in any thread."""
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            stack = getattr(_local, 'stack', None)
+            if stack and self in stack:
+                return function(*args, **kwargs)
+            with self:
+                return function(*args, **kwargs)
+        return wrapper
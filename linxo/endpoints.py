@@ -0,0 +1,166 @@
+# -*- encoding: utf-8 -*-
+
+"""
+Typed bindings of the Linxo API endpoints.
+
+Methods are generated from :py:data:`API`, a description of the endpoints, and
+available on every client by resource::
+
+    client.accounts.list()
+    client.accounts.transactions(account_id, start_date='2018-01-01', limit=500)
+    client.connections.synchronize(connection_id)
+
+Path parameters are positional, query string (``GET``) or body parameters are
+keyword arguments, and unknown ones raise :py:exc:`TypeError`. Paths are
+built from templates compiled once at import, without the generic processing
+of :py:meth:`linxo.client.Client.get`, and calls are labelled with their
+template in metrics and circuit breakers. Other calls on a path described in
+:py:data:`API` get the same label, see :py:func:`match_template`.
+
+Like other calls, ``_timeout`` overrides the client timeout.
+"""
+
+import re
+
+try:
+    from urllib import urlencode, quote
+except ImportError:  # noqa
+    from urllib.parse import urlencode, quote
+
+#: Linxo API description: methods of each resource, with their HTTP method,
+#: path template and accepted query string or body parameters.
+API = {
+    'accounts': {
+        'list': ('GET', '/accounts', ('connection_id', 'type', 'page', 'limit')),
+        'get': ('GET', '/accounts/{account_id}', ()),
+        'update': ('PUT', '/accounts/{account_id}', ('name', 'type')),
+        'delete': ('DELETE', '/accounts/{account_id}', ()),
+        'transactions': ('GET', '/accounts/{account_id}/transactions',
+                         ('start_date', 'end_date', 'page', 'limit')),
+    },
+    'transactions': {
+        'list': ('GET', '/transactions',
+                 ('account_id', 'start_date', 'end_date', 'page', 'limit')),
+        'get': ('GET', '/transactions/{transaction_id}', ()),
+        'update': ('PUT', '/transactions/{transaction_id}', ('label', 'category_id', 'notes')),
+    },
+    'connections': {
+        'list': ('GET', '/connections', ('page', 'limit')),
+        'get': ('GET', '/connections/{connection_id}', ()),
+        'delete': ('DELETE', '/connections/{connection_id}', ()),
+        'synchronize': ('POST', '/connections/{connection_id}/synchronizations', ()),
+    },
+    'users': {
+        'me': ('GET', '/users/me', ()),
+        'create': ('POST', '/users', ('email', 'password', 'firstname', 'lastname')),
+    },
+}
+
+_PARAMETER = re.compile(r'{(\w+)}')
+
+
+class Endpoint(object):
+    '''
+    A single endpoint, with its path template compiled to a format string.
+    '''
+    def __init__(self, name, method, template, parameters):
+        self.name = name
+        self.method = method
+        self.template = template
+        self.path_parameters = tuple(_PARAMETER.findall(template))
+        self.parameters = frozenset(parameters)
+        self._format = _PARAMETER.sub('%s', template.replace('%', '%%'))
+
+    def path(self, args):
+        if len(args) != len(self.path_parameters):
+            raise TypeError('{0}() takes {1} positional arguments ({2}) but {3} were given'.format(
+                self.name, len(self.path_parameters), ', '.join(self.path_parameters), len(args)))
+        return self._format % tuple(quote(str(arg), safe='') for arg in args)
+
+    def query_string(self, params):
+        """Encode ``params``, skipping ``None`` and lowering booleans."""
+        items = []
+        for key in sorted(params):
+            value = params[key]
+            if value is None:
+                continue
+            if isinstance(value, bool):
+                value = 'true' if value else 'false'
+            items.append((key, value))
+        return urlencode(items)
+
+    def check(self, params):
+        unknown = set(params) - self.parameters
+        if unknown:
+            raise TypeError('{0}() got unexpected keyword arguments: {1}'.format(
+                self.name, ', '.join(sorted(unknown))))
+
+    def __call__(self, client, args, params, timeout=None):
+        self.check(params)
+        path = self.path(args)
+        data = None
+        if self.method == 'GET':
+            if params:
+                query_string = self.query_string(params)
+                if query_string:
+                    path = path + '?' + query_string
+        elif self.method in ('POST', 'PUT'):
+            data = dict((k, v) for k, v in params.items() if v is not None)
+        return client.call(self.method, path, data, timeout=timeout,
+                           template=self.template)
+
+
+def _method(endpoint):
+    def method(self, *args, **kwargs):
+        timeout = kwargs.pop('_timeout', None)
+        return endpoint(self._client, args, kwargs, timeout)
+
+    method.__name__ = str(endpoint.name.split('.')[-1])
+    method.__doc__ = '``{0} {1}``, parameters: {2}'.format(
+        endpoint.method, endpoint.template,
+        ', '.join(endpoint.path_parameters + tuple(sorted(endpoint.parameters))) or 'none')
+    method.endpoint = endpoint
+    return method
+
+
+class Resource(object):
+    """Base class of the generated resources, bound to a client."""
+    def __init__(self, client):
+        self._client = client
+
+
+def _resource(name, methods):
+    attributes = {'__doc__': 'Endpoints of ``/{0}``.'.format(name)}
+    for method_name, (method, template, parameters) in methods.items():
+        endpoint = Endpoint('{0}.{1}'.format(name, method_name), method, template, parameters)
+        attributes[method_name] = _method(endpoint)
+    return type(str(name.capitalize() + 'Resource'), (Resource,), attributes)
+
+
+#: Resource classes generated from :py:data:`API`, by attribute name
+RESOURCES = dict((name, _resource(name, methods)) for name, methods in API.items())
+
+
+def _template_pattern(template):
+    parts = _PARAMETER.split(template)
+    # Odd parts are parameter names
+    return re.compile('^' + ''.join(
+        '[^/]+' if i % 2 else re.escape(part) for i, part in enumerate(parts)) + '$')
+
+
+# Templates of API, the ones with fewer parameters first so that literal
+# segments (/users/me) win over parameters
+_TEMPLATES = [(_template_pattern(template), template) for template in sorted(
+    set(template for methods in API.values() for _, template, _ in methods.values()),
+    key=lambda template: (len(_PARAMETER.findall(template)), template))]
+
+
+def match_template(path):
+    """
+    Return the :py:data:`API` template matching ``path``, without query string,
+    or ``None`` if the path is not described.
+    """
+    for pattern, template in _TEMPLATES:
+        if pattern.match(path):
+            return template
+    return None
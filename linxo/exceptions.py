@@ -45,3 +45,15 @@ class ResourceNotFoundError(APIError):
 
 class NetworkError(APIError):
     """Raised when there is an error from network layer."""
+
+
+class CassetteError(APIError):
+    """Raised when a cassette cannot be loaded or replay a request."""
+
+
+class CircuitOpenError(APIError):
+    """Raised when a call is rejected because its circuit is open."""
+
+
+class DeadlineExceeded(APIError):
+    """Raised when a call is made after its deadline expired or was cancelled."""
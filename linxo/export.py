@@ -0,0 +1,334 @@
+# -*- encoding: utf-8 -*-
+
+"""
+Stream accounts and transactions to files, in a resumable way.
+
+Accounts are written to ``accounts.<format>``, then the transactions of each
+account to their own partition, ``transactions-<account_id>.<format>``, with
+``workers`` accounts fetched in parallel. Pages are written as soon as they are
+received, so memory use does not depend on the number of transactions.
+
+Progress is saved in ``checkpoint.json`` after each page: running the export
+again with the same output directory resumes where it stopped. When the export
+fails or is interrupted, partitions being exported stop after their current
+page and the others are not started. Parquet files
+cannot be appended to, so an interrupted Parquet partition restarts from its
+first page.
+
+Supported formats are ``jsonl``, ``csv`` and ``parquet`` (requires
+``pyarrow``). CSV columns are the fields of the first row of each partition,
+nested values are written as JSON.
+"""
+
+import csv
+import io
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+try:
+    from time import monotonic
+except ImportError:  # pragma: no cover
+    # Python 2
+    from time import time as monotonic
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # pragma: no cover
+    pyarrow = None
+
+from . import deadline
+from .exceptions import APIError
+
+#: Name of the checkpoint file in the output directory
+CHECKPOINT = 'checkpoint.json'
+
+
+class JSONLinesWriter(object):
+    '''
+    Write rows as JSON lines, appending from byte ``offset`` of ``path``.
+    '''
+    extension = 'jsonl'
+    resumable = True
+
+    def __init__(self, path, state):
+        self._file = open(path, 'ab')
+        self._file.truncate(state.get('offset', 0))
+        self._file.seek(0, os.SEEK_END)
+
+    def _encode(self, rows):
+        return ''.join(json.dumps(row, sort_keys=True) + '\n' for row in rows)
+
+    def write(self, rows, state):
+        self._file.write(self._encode(rows).encode('utf-8'))
+
+    def flush(self, state):
+        """Make written rows durable and record the position in ``state``."""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        state['offset'] = self._file.tell()
+
+    def close(self):
+        self._file.close()
+
+
+class CSVWriter(JSONLinesWriter):
+    '''
+    Write rows as CSV, with the fields of the first row as columns.
+    '''
+    extension = 'csv'
+
+    def _encode_value(self, value):
+        if isinstance(value, (dict, list)):
+            return json.dumps(value, sort_keys=True)
+        return value
+
+    def write(self, rows, state):
+        if not rows:
+            return
+        buf = io.StringIO()
+        fields = state.get('fields')
+        if fields is None:
+            fields = state['fields'] = sorted(rows[0])
+            csv.writer(buf).writerow(fields)
+        writer = csv.DictWriter(buf, fields, extrasaction='ignore')
+        for row in rows:
+            writer.writerow(dict((k, self._encode_value(v)) for k, v in row.items()))
+        self._file.write(buf.getvalue().encode('utf-8'))
+
+
+class ParquetWriter(object):
+    '''
+    Write rows to a Parquet file, one row group per page.
+    '''
+    extension = 'parquet'
+    resumable = False
+
+    def __init__(self, path, state):
+        if pyarrow is None:
+            raise ImportError('pyarrow is required to export to parquet')
+        self.path = path
+        self._writer = None
+
+    def write(self, rows, state):
+        if not rows:
+            return
+        if self._writer is None:
+            table = pyarrow.Table.from_pylist(rows)
+            self._writer = pyarrow.parquet.ParquetWriter(self.path, table.schema)
+        else:
+            table = pyarrow.Table.from_pylist(rows, schema=self._writer.schema)
+        self._writer.write_table(table)
+
+    def flush(self, state):
+        pass
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+#: Writer class of each format
+FORMATS = {
+    'jsonl': JSONLinesWriter,
+    'csv': CSVWriter,
+    'parquet': ParquetWriter,
+}
+
+
+class Progress(object):
+    """Thread safe export counters."""
+    def __init__(self, partitions=0):
+        self._lock = threading.Lock()
+        self.started_at = monotonic()
+        self.rows = 0
+        self.pages = 0
+        self.partitions = partitions
+        self.done = 0
+
+    def add(self, rows=0, pages=0, done=0, partitions=0):
+        with self._lock:
+            self.rows += rows
+            self.pages += pages
+            self.done += done
+            self.partitions += partitions
+
+    def report(self):
+        elapsed = max(monotonic() - self.started_at, 1e-6)
+        logging.info('Exported %d rows in %d pages (%.1f rows/s), %d/%d partitions done',
+                     self.rows, self.pages, self.rows / elapsed, self.done,
+                     self.partitions)
+
+
+class Exporter(object):
+    '''
+    Export accounts and transactions of a client to ``output`` directory.
+
+    :param client: :py:class:`linxo.client.Client` to use, shared by threads
+    :param str output: output directory, created if needed
+    :param str format: one of :py:data:`FORMATS`
+    :param int workers: number of accounts exported in parallel
+    :param int page_size: number of items requested per page
+    :param float report_interval: seconds between two progress reports
+    :param dict params: extra query string parameters of transaction requests,
+        for instance ``{'start_date': ...}``
+    '''
+
+    #: Path listing accounts
+    accounts_path = '/accounts'
+
+    #: Path listing transactions, filtered on ``account_id``
+    transactions_path = '/transactions'
+
+    def __init__(self, client, output, format='jsonl', workers=4,
+                 page_size=100, report_interval=10, params=None):
+        if format not in FORMATS:
+            raise ValueError('Unknown format {0}, valid formats: {1}'.format(
+                format, ', '.join(sorted(FORMATS))))
+        self.client = client
+        self.output = output
+        self.writer_class = FORMATS[format]
+        self.workers = workers
+        self.page_size = page_size
+        self.report_interval = report_interval
+        self.params = params or {}
+
+        self.progress = Progress()
+        self._lock = threading.Lock()
+        self._checkpoint = {'partitions': {}}
+        self._stopping = threading.Event()
+
+    def _checkpoint_path(self):
+        return os.path.join(self.output, CHECKPOINT)
+
+    def _load_checkpoint(self):
+        path = self._checkpoint_path()
+        if os.path.isfile(path):
+            with open(path) as f:
+                self._checkpoint = json.load(f)
+
+    def _save_checkpoint(self):
+        """Atomically write the checkpoint, must be called with the lock."""
+        path = self._checkpoint_path()
+        with open(path + '.tmp', 'w') as f:
+            json.dump(self._checkpoint, f, sort_keys=True)
+        os.rename(path + '.tmp', path)
+
+    def _state(self, name):
+        with self._lock:
+            state = self._checkpoint['partitions'].setdefault(name, {})
+            if not self.writer_class.resumable and not state.get('done'):
+                state.clear()
+            return dict(state)
+
+    def _commit(self, name, state):
+        with self._lock:
+            self._checkpoint['partitions'][name] = dict(state)
+            self._save_checkpoint()
+
+    def export_partition(self, name, path, params=None, id_field=None):
+        """
+        Stream all pages of ``path`` to partition ``name``. When ``id_field``
+        is set, the ``id_field`` values of the rows are kept in the partition
+        state, under ``ids``.
+        """
+        state = self._state(name)
+        if state.get('done'):
+            self.progress.add(done=1)
+            return state
+
+        filename = '{0}.{1}'.format(name, self.writer_class.extension)
+        writer = self.writer_class(os.path.join(self.output, filename), state)
+        try:
+            page = state.get('page', 1)
+            while True:
+                if self._stopping.is_set():
+                    return state
+                try:
+                    rows = self.client.get(path, page=page, limit=self.page_size,
+                                           **(params or {}))
+                except Exception:
+                    # The export fails: other partitions stop after their page
+                    self._stopping.set()
+                    raise
+                writer.write(rows, state)
+                writer.flush(state)
+                if id_field is not None:
+                    state['ids'] = state.get('ids', []) + [row[id_field] for row in rows]
+
+                page += 1
+                state['page'] = page
+                state['rows'] = state.get('rows', 0) + len(rows)
+                if len(rows) < self.page_size:
+                    state['done'] = True
+                self._commit(name, state)
+                self.progress.add(rows=len(rows), pages=1)
+
+                if state.get('done'):
+                    break
+        finally:
+            writer.close()
+
+        self.progress.add(done=1)
+        return state
+
+    def _account_ids(self):
+        return self.export_partition('accounts', self.accounts_path, id_field='id')['ids']
+
+    def _reporter(self, stop):
+        while not stop.wait(self.report_interval):
+            self.progress.report()
+
+    def run(self):
+        """Run or resume the export, return the :py:class:`Progress`."""
+        if not os.path.isdir(self.output):
+            os.makedirs(self.output)
+        self._load_checkpoint()
+        self._stopping.clear()
+
+        stop = threading.Event()
+        reporter = threading.Thread(target=self._reporter, args=(stop,))
+        reporter.daemon = True
+        reporter.start()
+
+        try:
+            self.progress.add(partitions=1)
+            account_ids = self._account_ids()
+            self.progress.add(partitions=len(account_ids))
+
+            export = self.export_partition
+            active = deadline.current()
+            if active is not None:
+                export = active.wrap(export)
+
+            executor = ThreadPoolExecutor(max_workers=self.workers)
+            futures = []
+            try:
+                for account_id in account_ids:
+                    params = dict(self.params, account_id=account_id)
+                    futures.append(executor.submit(
+                        export, 'transactions-{0}'.format(account_id),
+                        self.transactions_path, params))
+
+                for future in as_completed(futures):
+                    try:
+                        future.result()
+                    except APIError as error:
+                        logging.error('Partition export failed: %s', error)
+                        raise
+            except BaseException:
+                # KeyboardInterrupt included: do not wait for queued partitions
+                self._stopping.set()
+                for future in futures:
+                    future.cancel()
+                raise
+            finally:
+                executor.shutdown(wait=False)
+        finally:
+            stop.set()
+            self.progress.report()
+
+        return self.progress
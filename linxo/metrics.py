@@ -0,0 +1,54 @@
+# -*- encoding: utf-8 -*-
+
+"""
+Request metrics of a :py:class:`linxo.client.Client`.
+
+Calls are counted by HTTP method and path template, for instance
+``GET /accounts/{account_id}/transactions``, so that requests on different
+resources share the same label::
+
+    from linxo.metrics import Metrics
+
+    metrics = Metrics()
+    client = Client(metrics=metrics)
+    client.accounts.list()
+    metrics.snapshot()
+    # {'GET /accounts': {'count': 1, 'errors': 0, 'seconds': 0.21}}
+"""
+
+import threading
+
+
+class Metrics(object):
+    '''
+    Call counters, errors and cumulated duration by label. Can be shared
+    between clients and threads.
+    '''
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def record(self, method, template, elapsed, error=None):
+        """Count a call of ``method`` on ``template`` which took ``elapsed``."""
+        label = '{0} {1}'.format(method.upper(), template)
+        with self._lock:
+            stats = self._stats.get(label)
+            if stats is None:
+                stats = self._stats[label] = {'count': 0, 'errors': 0, 'seconds': 0.0}
+            stats['count'] += 1
+            stats['seconds'] += elapsed
+            if error is not None:
+                stats['errors'] += 1
+
+    def snapshot(self):
+        """Return a copy of the counters, as a dict of dicts by label."""
+        with self._lock:
+            return dict((label, dict(stats)) for label, stats in self._stats.items())
+
+    def merge(self, snapshot):
+        """Add the counters of a :py:meth:`snapshot`, of another process for instance."""
+        with self._lock:
+            for label, other in snapshot.items():
+                stats = self._stats.setdefault(label, {'count': 0, 'errors': 0, 'seconds': 0.0})
+                for key in stats:
+                    stats[key] += other.get(key, 0)
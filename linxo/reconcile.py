@@ -0,0 +1,271 @@
+# -*- encoding: utf-8 -*-
+
+"""
+Detect duplicated, modified and deleted transactions across pulls.
+
+Transactions are indexed in a SQLite database by id, with two hashes:
+
+* a *fingerprint* of the fields identifying the underlying bank operation
+  (account, date, amount, currency and normalized label), which stays the
+  same when a re-synchronized connection returns it with a new id,
+* a *digest* of the whole transaction, which changes when it is modified.
+
+Each pull of a *scope* (usually an account) is a run. Every transaction of the
+run is classified in O(1) index lookups, and transactions of the scope not seen
+during the run are deleted when it finishes::
+
+    from linxo.reconcile import TransactionIndex, NEW, MODIFIED
+
+    index = TransactionIndex('transactions.db')
+    with index.run(scope=account_id) as run:
+        for transaction in client.get('/transactions', account_id=account_id):
+            status = run.add(transaction)
+            if status in (NEW, MODIFIED):
+                store(transaction)
+        for transaction_id in run.additions():
+            store(client.transactions.get(transaction_id))
+        for deletion in run.deletions():
+            delete(deletion.id, replaced_by=deletion.replaced_by)
+
+A transaction is a *duplicate* when its id was already seen in the run
+(overlapping pulls), or when it has a new id but the fingerprint of a known
+transaction which was not seen yet in the run. If that known transaction is
+not returned by the end of the run, the duplicate replaces it and is reported
+in :py:meth:`Run.deletions` as ``replaced_by``.
+
+When the known transaction is returned later in the run, the duplicate is
+matched to another unseen transaction with the same fingerprint, if any.
+Otherwise it was a new transaction after all, identical to a known one, and
+is reported by :py:meth:`Run.additions`.
+
+A run is a single SQLite transaction, committed by :py:meth:`Run.finish`: a
+run which fails changes nothing, so its transactions are reported again by the
+next run. Runs of the same index must not overlap.
+
+Only the database grows with the number of transactions, memory use does not.
+"""
+
+import collections
+import hashlib
+import json
+import sqlite3
+
+#: Transaction status returned by :py:meth:`Run.add`
+NEW = 'new'
+UNCHANGED = 'unchanged'
+MODIFIED = 'modified'
+DUPLICATE = 'duplicate'
+
+#: Transaction removed from the index at the end of a run. ``replaced_by`` is
+#: the id of its duplicate with a new id, if any.
+Deletion = collections.namedtuple('Deletion', 'id replaced_by')
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS transactions (
+    id TEXT PRIMARY KEY,
+    scope TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    run INTEGER NOT NULL,
+    claimed INTEGER NOT NULL DEFAULT 0,
+    duplicate_of TEXT,
+    added INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS transactions_fingerprint
+    ON transactions (scope, fingerprint);
+CREATE INDEX IF NOT EXISTS transactions_run ON transactions (scope, run);
+CREATE INDEX IF NOT EXISTS transactions_duplicate_of
+    ON transactions (duplicate_of);
+CREATE INDEX IF NOT EXISTS transactions_added ON transactions (scope, added);
+CREATE TABLE IF NOT EXISTS runs (
+    scope TEXT PRIMARY KEY,
+    run INTEGER NOT NULL
+);
+'''
+
+
+def _normalize(value):
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, (int, float)):
+        return '{0:.2f}'.format(value)
+    return ' '.join(str(value).split()).lower()
+
+
+def _hash(value):
+    data = json.dumps(value, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+
+class Run(object):
+    '''
+    Reconciliation of one pull of ``scope``, see :py:meth:`TransactionIndex.run`.
+    '''
+    def __init__(self, index, scope, number):
+        self.index = index
+        self.scope = scope
+        self.number = number
+        self.counts = collections.Counter()
+        self._finished = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.finish()
+        else:
+            # An incomplete pull must not change anything
+            self.index.db.rollback()
+
+    def add(self, transaction):
+        """Index ``transaction``, return its status."""
+        index = self.index
+        db = index.db
+        transaction_id = str(transaction['id'])
+        fingerprint = index.fingerprint(transaction)
+        digest = index.digest(transaction)
+
+        row = db.execute('SELECT digest, run, claimed FROM transactions WHERE id = ?',
+                         (transaction_id,)).fetchone()
+        if row is not None:
+            if row[1] == self.number:
+                status = DUPLICATE
+            else:
+                status = UNCHANGED if row[0] == digest else MODIFIED
+                db.execute('UPDATE transactions SET fingerprint = ?, digest = ?, run = ?, '
+                           'claimed = 0 WHERE id = ?',
+                           (fingerprint, digest, self.number, transaction_id))
+                if row[2] == self.number:
+                    self._reassign(transaction_id)
+        else:
+            original = self._unclaimed(fingerprint)
+            if original is not None:
+                status = DUPLICATE
+                db.execute('UPDATE transactions SET claimed = ? WHERE id = ?',
+                           (self.number, original))
+            else:
+                status = NEW
+            db.execute('INSERT INTO transactions (id, scope, fingerprint, digest, run, duplicate_of) '
+                       'VALUES (?, ?, ?, ?, ?, ?)',
+                       (transaction_id, self.scope, fingerprint, digest, self.number, original))
+
+        self.counts[status] += 1
+        return status
+
+    def _unclaimed(self, fingerprint):
+        """Id of a transaction with ``fingerprint``, not seen nor claimed in this run."""
+        row = self.index.db.execute(
+            'SELECT id FROM transactions WHERE scope = ? AND fingerprint = ? '
+            'AND duplicate_of IS NULL AND run < ? AND claimed < ? LIMIT 1',
+            (self.scope, fingerprint, self.number, self.number)).fetchone()
+        return row[0] if row is not None else None
+
+    def _reassign(self, original):
+        """
+        ``original``, claimed by a duplicate, was seen: match the duplicate to
+        another transaction, or make it a new one.
+        """
+        db = self.index.db
+        duplicate, fingerprint = db.execute(
+            'SELECT id, fingerprint FROM transactions WHERE duplicate_of = ? AND run = ?',
+            (original, self.number)).fetchone()
+        other = self._unclaimed(fingerprint)
+        if other is not None:
+            db.execute('UPDATE transactions SET claimed = ? WHERE id = ?', (self.number, other))
+            db.execute('UPDATE transactions SET duplicate_of = ? WHERE id = ?', (other, duplicate))
+        else:
+            db.execute('UPDATE transactions SET duplicate_of = NULL, added = ? WHERE id = ?',
+                       (self.number, duplicate))
+            self.counts[DUPLICATE] -= 1
+            self.counts[NEW] += 1
+
+    def additions(self):
+        """
+        Yield the ids of transactions reported as duplicates by :py:meth:`add`
+        which turned out to be new, the transaction they matched having been
+        returned later in the run. Must be called before :py:meth:`finish`.
+        """
+        cursor = self.index.db.execute(
+            'SELECT id FROM transactions WHERE scope = ? AND added = ? ORDER BY id',
+            (self.scope, self.number))
+        for row in cursor:
+            yield row[0]
+
+    def deletions(self):
+        """
+        Yield a :py:class:`Deletion` for each transaction of the scope not seen
+        during this run. Must be called before :py:meth:`finish`.
+        """
+        cursor = self.index.db.execute(
+            'SELECT t.id, d.id FROM transactions t '
+            'LEFT JOIN transactions d ON d.duplicate_of = t.id AND d.run = ? '
+            'WHERE t.scope = ? AND t.run < ? AND t.duplicate_of IS NULL '
+            'ORDER BY t.id',
+            (self.number, self.scope, self.number))
+        seen = None
+        for transaction_id, replaced_by in cursor:
+            # Several duplicates may point to the same transaction
+            if transaction_id != seen:
+                seen = transaction_id
+                yield Deletion(transaction_id, replaced_by)
+
+    def finish(self):
+        """Remove transactions not seen during this run and commit."""
+        if self._finished:
+            return
+        db = self.index.db
+        # Duplicates of deleted transactions replace them
+        db.execute(
+            'UPDATE transactions SET duplicate_of = NULL '
+            'WHERE scope = ? AND run = ? AND duplicate_of IN ('
+            '    SELECT id FROM transactions WHERE scope = ? AND run < ?)',
+            (self.scope, self.number, self.scope, self.number))
+        cursor = db.execute('DELETE FROM transactions WHERE scope = ? AND run < ?',
+                            (self.scope, self.number))
+        self.counts['deleted'] += cursor.rowcount
+        db.commit()
+        self._finished = True
+
+
+class TransactionIndex(object):
+    '''
+    Persistent transaction index stored in SQLite database ``path``.
+
+    :param str path: database file, ``':memory:'`` for a temporary index
+    '''
+
+    #: Fields identifying the bank operation behind a transaction
+    fingerprint_fields = ('account_id', 'date', 'amount', 'currency', 'label')
+
+    #: Fields ignored when checking whether a transaction was modified
+    ignored_fields = ('id',)
+
+    def __init__(self, path):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.execute('PRAGMA journal_mode = WAL')
+        self.db.execute('PRAGMA synchronous = NORMAL')
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def fingerprint(self, transaction):
+        """Hash of the normalized :py:attr:`fingerprint_fields`."""
+        return _hash([_normalize(transaction.get(field))
+                      for field in self.fingerprint_fields])
+
+    def digest(self, transaction):
+        """Hash of the whole transaction, except :py:attr:`ignored_fields`."""
+        return _hash(dict((k, v) for k, v in transaction.items()
+                          if k not in self.ignored_fields))
+
+    def run(self, scope=''):
+        """Start a new :py:class:`Run` of ``scope``."""
+        row = self.db.execute('SELECT run FROM runs WHERE scope = ?', (scope,)).fetchone()
+        number = (row[0] if row else 0) + 1
+        self.db.execute('INSERT OR REPLACE INTO runs (scope, run) VALUES (?, ?)',
+                        (scope, number))
+        self.db.commit()
+        return Run(self, scope, number)
@@ -0,0 +1,203 @@
+# -*- encoding: utf-8 -*-
+
+"""
+Run a synchronization task on many shards (accounts, tenants...) with a pool of
+processes, to use several cores for parsing and normalizing API results.
+
+Each worker process has its own :py:class:`linxo.client.Client`, but they share
+a single OAuth token: Linxo refresh tokens are rotated on use, so a refresh
+made by one worker would invalidate the refresh token of the others. With a
+:py:class:`SharedToken`, only one process refreshes at a time and the others
+adopt the new token::
+
+    from linxo.runner import ShardedRunner
+
+    def normalize(client, account_id):
+        for transaction in client.accounts.transactions(account_id, limit=500):
+            yield transform(transaction)
+
+    runner = ShardedRunner(normalize, processes=8)
+    for account_id, row in runner.run(account_ids):
+        store(account_id, row)
+
+    print(runner.metrics.snapshot(), runner.errors)
+
+``task`` must be a module level function, and its results picklable: they are
+sent to the parent process in batches of ``batch_size``. Metrics of every
+worker are merged into :py:attr:`ShardedRunner.metrics` once it is done.
+"""
+
+import logging
+import multiprocessing
+import pickle
+from time import time
+
+try:
+    from queue import Empty
+except ImportError:  # pragma: no cover
+    # Python 2
+    from Queue import Empty
+
+from .client import Client
+from .exceptions import APIError
+from .metrics import Metrics
+
+#: Messages sent by workers to the parent process
+RESULTS = 'results'
+ERROR = 'error'
+DONE = 'done'
+
+
+class SharedToken(object):
+    '''
+    OAuth token shared by the clients of several processes.
+
+    :param state: dict shared by the processes, like a ``Manager().dict()``
+    :param lock: lock shared by the processes, like a ``Manager().Lock()``
+    :param float margin: seconds before expiry when the token is refreshed
+    '''
+    def __init__(self, state, lock, margin=30):
+        self.state = state
+        self.lock = lock
+        self.margin = margin
+
+    def _adopt(self, client, token):
+        """Use ``token`` in ``client`` if it is more recent than its own."""
+        current = client._session.token
+        if token and token.get('expires_at', 0) > current.get('expires_at', 0):
+            client._update_token(token)
+
+    def ensure(self, client):
+        """
+        Make sure ``client`` has a valid token, refreshing the shared one if
+        needed. Called by the client before each request, so the shared state
+        is only read when the token of the client is about to expire.
+        """
+        if client._session.token.get('expires_at', 0) > time() + self.margin:
+            return
+        self._adopt(client, self.state.get('token'))
+        if client._session.token.get('expires_at', 0) > time() + self.margin:
+            return
+
+        with self.lock:
+            # Another process may have refreshed it while we were waiting
+            token = self.state.get('token')
+            self._adopt(client, token)
+            if client._session.token.get('expires_at', 0) > time() + self.margin:
+                return
+
+            session = client._session
+            token = session.refresh_token(client.token_url,
+                                          refresh_token=session.token.get('refresh_token'),
+                                          timeout=client._timeout)
+            self.state['token'] = dict(token)
+            client._update_token(token)
+            session.token_updater(token)
+
+
+def _send_error(results, shard, error):
+    try:
+        pickle.dumps(error)
+    except Exception:
+        error = APIError(str(error))
+    results.put((ERROR, shard, error))
+
+
+def _worker(task, client_kwargs, token, shards, results, batch_size):
+    """Process shards from ``shards`` until the ``None`` sentinel."""
+    metrics = Metrics()
+    client = Client(token_store=token, metrics=metrics, **client_kwargs)
+
+    for shard in iter(shards.get, None):
+        batch = []
+        try:
+            for result in task(client, shard):
+                batch.append(result)
+                if len(batch) >= batch_size:
+                    results.put((RESULTS, shard, batch))
+                    batch = []
+            if batch:
+                results.put((RESULTS, shard, batch))
+        except Exception as error:
+            logging.exception('Shard %s failed', shard)
+            _send_error(results, shard, error)
+
+    results.put((DONE, None, metrics.snapshot()))
+
+
+class ShardedRunner(object):
+    '''
+    Run ``task(client, shard)`` for every shard in a pool of processes.
+
+    :param task: module level function returning an iterable of picklable
+        results for a shard
+    :param int processes: number of worker processes
+    :param dict client_kwargs: arguments of each worker
+        :py:class:`linxo.client.Client`, which must be picklable
+    :param int batch_size: results sent to the parent process at once
+    :param str start_method: ``multiprocessing`` start method, defaults to
+        the platform one
+    '''
+    def __init__(self, task, processes=None, client_kwargs=None, batch_size=100,
+                 start_method=None):
+        self.task = task
+        self.processes = processes or multiprocessing.cpu_count()
+        self.client_kwargs = client_kwargs or {}
+        self.batch_size = batch_size
+        if hasattr(multiprocessing, 'get_context'):
+            self._context = multiprocessing.get_context(start_method)
+        else:  # pragma: no cover
+            # Python 2
+            self._context = multiprocessing
+
+        #: Metrics of all the workers, merged once they are done
+        self.metrics = Metrics()
+
+        #: Exception which stopped each failed shard
+        self.errors = {}
+
+    def run(self, shards):
+        """Yield ``(shard, result)`` tuples as the workers produce them."""
+        context = self._context
+        manager = context.Manager()
+        shard_queue = context.Queue()
+        # Bounded, so that workers wait when the parent falls behind
+        results = context.Queue(maxsize=self.processes * 4)
+        workers = []
+        try:
+            token = SharedToken(manager.dict(), manager.Lock())
+            for shard in shards:
+                shard_queue.put(shard)
+            for _ in range(self.processes):
+                shard_queue.put(None)
+
+            for _ in range(self.processes):
+                worker = context.Process(target=_worker, args=(
+                    self.task, self.client_kwargs, token, shard_queue, results,
+                    self.batch_size))
+                worker.daemon = True
+                worker.start()
+                workers.append(worker)
+
+            running = len(workers)
+            while running:
+                try:
+                    kind, shard, payload = results.get(timeout=1)
+                except Empty:
+                    if not any(worker.is_alive() for worker in workers):
+                        raise RuntimeError('Worker processes exited unexpectedly')
+                    continue
+                if kind == RESULTS:
+                    for result in payload:
+                        yield shard, result
+                elif kind == ERROR:
+                    self.errors[shard] = payload
+                else:
+                    self.metrics.merge(payload)
+                    running -= 1
+        finally:
+            for worker in workers:
+                if worker.is_alive():
+                    worker.terminate()
+                worker.join()
+            manager.shutdown()
@@ -0,0 +1,251 @@
+# -*- encoding: utf-8 -*-
+
+"""
+Trigger bank connection synchronizations and wait for them to finish.
+
+Requires a token with the ``connections_sync`` scope::
+
+    from linxo import Client
+    from linxo.sync import SyncOrchestrator
+
+    orchestrator = SyncOrchestrator(Client(), max_in_flight=8)
+
+    # blocking
+    results = orchestrator.sync(['1234', '5678'], timeout=600)
+
+    # or in background, with a callback per finished connection
+    handle = orchestrator.start(['1234', '5678'], callback=print)
+    handle.join()
+
+Each connection status is polled with an adaptive interval: it starts at
+``initial_interval`` and grows by ``backoff`` while the status does not change,
+up to ``max_interval``. It goes back to ``initial_interval`` as soon as the
+status changes. At most ``max_in_flight`` requests run at the same time.
+
+When called under a :py:class:`linxo.deadline.Deadline`, polling stops once it
+expires or is cancelled, and unfinished connections are reported as timed out.
+A cancelled deadline interrupts the wait between polls.
+"""
+
+import collections
+import heapq
+import itertools
+import logging
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from time import sleep
+
+try:
+    from time import monotonic
+except ImportError:  # pragma: no cover
+    # Python 2
+    from time import time as monotonic
+
+from . import deadline
+from .exceptions import APIError, DeadlineExceeded
+
+#: Status given to connections still running when the timeout expires
+TIMEOUT = 'TIMEOUT'
+
+#: Status given to connections whose synchronization could not be followed
+ERROR = 'ERROR'
+
+#: Longest wait for in-flight requests before checking the deadline again
+DEADLINE_TICK = 0.1
+
+#: Result of a connection synchronization. ``data`` is the last connection
+#: returned by the API, ``error`` the :py:class:`APIError` which stopped it.
+SyncResult = collections.namedtuple(
+    'SyncResult', 'connection_id status data error polls duration')
+
+
+class _Sync(object):
+    """Progress of a single connection."""
+    def __init__(self, connection_id, interval):
+        self.connection_id = connection_id
+        self.interval = interval
+        self.triggered = False
+        self.status = None
+        self.data = None
+        self.polls = 0
+        self.errors = 0
+        self.started_at = monotonic()
+
+
+class SyncOrchestrator(object):
+    '''
+    Trigger and follow synchronizations of many connections concurrently.
+
+    :param client: :py:class:`linxo.client.Client` to use, shared by threads
+    :param int max_in_flight: maximum number of concurrent API requests
+    :param float initial_interval: seconds before the first status poll
+    :param float max_interval: maximum seconds between two status polls
+    :param float backoff: interval growth while the status does not change
+    :param int max_errors: consecutive failed polls before giving up
+    '''
+
+    #: Path triggering the synchronization of a connection
+    trigger_path = '/connections/{0}/synchronizations'
+
+    #: Path returning the connection and its synchronization status
+    status_path = '/connections/{0}'
+
+    #: Field of the connection holding its status
+    status_field = 'status'
+
+    #: Statuses meaning the synchronization is over
+    final_statuses = frozenset([
+        'SUCCESS', 'PARTIAL_SUCCESS', 'FAILED', 'CLOSED', 'NONE',
+        'ACTION_NEEDED', 'AUTH_FAILED',
+    ])
+
+    def __init__(self, client, max_in_flight=4, initial_interval=2,
+                 max_interval=60, backoff=1.5, max_errors=3):
+        self.client = client
+        self.max_in_flight = max_in_flight
+        self.initial_interval = initial_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.max_errors = max_errors
+
+    def sync(self, connection_ids, timeout=None):
+        """
+        Synchronize ``connection_ids`` and block until all of them are done,
+        or ``timeout`` seconds have elapsed.
+        Return a dict of :py:class:`SyncResult` by connection id.
+        """
+        results = {}
+
+        def collect(result):
+            results[result.connection_id] = result
+
+        self._run(connection_ids, collect, timeout, deadline.current())
+        return results
+
+    def start(self, connection_ids, callback, timeout=None):
+        """
+        Synchronize ``connection_ids`` in a background thread, calling
+        ``callback`` with a :py:class:`SyncResult` for each finished
+        connection. Return the started thread.
+        """
+        thread = threading.Thread(target=self._run,
+                                  args=(connection_ids, callback, timeout,
+                                        deadline.current()))
+        thread.daemon = True
+        thread.start()
+        return thread
+
+    def _trigger(self, connection_id):
+        return self.client.post(self.trigger_path.format(connection_id))
+
+    def _status(self, connection_id):
+        return self.client.get(self.status_path.format(connection_id))
+
+    def _finish(self, callback, sync, status, error=None):
+        result = SyncResult(sync.connection_id, status, sync.data, error,
+                            sync.polls, monotonic() - sync.started_at)
+        try:
+            callback(result)
+        except Exception:
+            logging.exception('Sync callback failed for connection %s',
+                              sync.connection_id)
+
+    def _next_interval(self, sync, status):
+        """Compute the delay before the next poll of ``sync``."""
+        if status == sync.status:
+            sync.interval = min(sync.interval * self.backoff, self.max_interval)
+        else:
+            sync.interval = self.initial_interval
+        sync.status = status
+        return sync.interval
+
+    def _run(self, connection_ids, callback, timeout, active=None):
+        expires_at = None if timeout is None else monotonic() + timeout
+        trigger, status = self._trigger, self._status
+        if active is not None:
+            # Requests run in the pool threads, under the caller deadline
+            trigger, status = active.wrap(trigger), active.wrap(status)
+            end = monotonic() + active.remaining()
+            expires_at = end if expires_at is None else min(expires_at, end)
+
+        counter = itertools.count()
+        scheduled = []
+        running = {}
+
+        def schedule(sync, delay):
+            heapq.heappush(scheduled, (monotonic() + delay, next(counter), sync))
+
+        for connection_id in connection_ids:
+            schedule(_Sync(connection_id, self.initial_interval), 0)
+
+        executor = ThreadPoolExecutor(max_workers=self.max_in_flight)
+        try:
+            while scheduled or running:
+                now = monotonic()
+                if expires_at is not None and now >= expires_at:
+                    break
+                if active is not None and active.expired:
+                    break
+
+                # Send due requests, without exceeding max_in_flight
+                while scheduled and scheduled[0][0] <= now and len(running) < self.max_in_flight:
+                    sync = heapq.heappop(scheduled)[2]
+                    request = status if sync.triggered else trigger
+                    running[executor.submit(request, sync.connection_id)] = sync
+
+                # Wait for a response or the next due request
+                wait_for = None
+                if scheduled and len(running) < self.max_in_flight:
+                    wait_for = max(scheduled[0][0] - now, 0)
+                if expires_at is not None:
+                    wait_for = min(x for x in (wait_for, expires_at - now) if x is not None)
+
+                if not running:
+                    if active is not None:
+                        active.sleep(wait_for)
+                    else:
+                        sleep(wait_for)
+                    continue
+
+                if active is not None:
+                    # Requests cannot be interrupted, only stop waiting for them
+                    wait_for = DEADLINE_TICK if wait_for is None else min(wait_for, DEADLINE_TICK)
+
+                done, _ = wait(running, timeout=wait_for, return_when=FIRST_COMPLETED)
+                for future in done:
+                    sync = running.pop(future)
+                    try:
+                        data = future.result()
+                    except DeadlineExceeded as error:
+                        self._finish(callback, sync, TIMEOUT, error)
+                        continue
+                    except APIError as error:
+                        sync.errors += 1
+                        if not sync.triggered or sync.errors >= self.max_errors:
+                            self._finish(callback, sync, ERROR, error)
+                        else:
+                            schedule(sync, self._next_interval(sync, sync.status))
+                        continue
+
+                    sync.errors = 0
+                    if not sync.triggered:
+                        sync.triggered = True
+                        schedule(sync, self.initial_interval)
+                        continue
+
+                    sync.polls += 1
+                    sync.data = data
+                    value = data.get(self.status_field)
+                    if value in self.final_statuses:
+                        self._finish(callback, sync, value)
+                    else:
+                        schedule(sync, self._next_interval(sync, value))
+
+            # Timeout: report every connection which did not finish
+            for future, sync in running.items():
+                future.cancel()
+                self._finish(callback, sync, TIMEOUT)
+            for _, _, sync in scheduled:
+                self._finish(callback, sync, TIMEOUT)
+        finally:
+            executor.shutdown(wait=False)
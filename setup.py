@@ -82,6 +82,7 @@ setup(
     # https://packaging.python.org/en/latest/requirements.html
     install_requires=[
         'future',
+        'futures; python_version < "3"',
         'requests-oauthlib',
     ],
 
@@ -92,6 +93,7 @@ setup(
     extras_require={
         'dev': [],
         'test': [],
+        'parquet': ['pyarrow'],
     },
 
     # If there are data files included in your packages that need to be
@@ -117,5 +119,9 @@ setup(
     #         'sample=sample:main',
     #     ],
     # },
-    entry_points={},
+    entry_points={
+        'console_scripts': [
+            'linxo=linxo.__main__:main',
+        ],
+    },
 )
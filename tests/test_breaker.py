@@ -0,0 +1,141 @@
+# -*- encoding: utf-8 -*-
+
+import unittest
+import mock
+import requests
+
+from linxo.client import Client, path_template
+from linxo.breaker import CircuitBreaker, CLOSED, OPEN, HALF_OPEN
+from linxo.exceptions import (
+    APIError, CircuitOpenError, HTTPError, ResourceNotFoundError,
+)
+
+CLIENT_ID = 'fake client_id'
+CLIENT_SECRET = 'fake client_secret'
+ENDPOINT = 'prod'
+
+FAKE_PATH = '/accounts/1234/transactions'
+
+
+class testCircuitBreaker(unittest.TestCase):
+    def setUp(self):
+        self.now = 1000.0
+        self.time_patch = mock.patch('linxo.breaker.monotonic', side_effect=lambda: self.now)
+        self.time_patch.start()
+
+    def tearDown(self):
+        self.time_patch.stop()
+
+    def _fail(self, breaker, error):
+        try:
+            with breaker.guard(ENDPOINT, FAKE_PATH):
+                raise error
+        except type(error):
+            pass
+
+    def test_path_template(self):
+        self.assertEqual('/accounts', path_template('/accounts?page=2'))
+        self.assertEqual('/accounts/{account_id}/transactions',
+                         path_template('/accounts/1234/transactions'))
+        self.assertEqual('/accounts/{id}/balances', path_template('/accounts/1234/balances'))
+        self.assertEqual('/users/{id}', path_template('/users/0f8fad5b-d9cb-469f-a165-70867728950e'))
+
+    def test_open(self):
+        breaker = CircuitBreaker(failure_threshold=2)
+
+        self._fail(breaker, HTTPError('timeout'))
+        self.assertEqual(CLOSED, breaker.circuit(ENDPOINT, FAKE_PATH).state)
+        self._fail(breaker, HTTPError('timeout'))
+        self.assertEqual(OPEN, breaker.circuit(ENDPOINT, FAKE_PATH).state)
+
+        with self.assertRaises(CircuitOpenError):
+            with breaker.guard(ENDPOINT, FAKE_PATH):
+                raise AssertionError('call should not be attempted')
+
+        # other circuits are not affected
+        with breaker.guard(ENDPOINT, '/accounts'):
+            pass
+
+    def test_client_errors(self):
+        breaker = CircuitBreaker(failure_threshold=1)
+
+        self._fail(breaker, ResourceNotFoundError('not found'))
+        self.assertEqual(CLOSED, breaker.circuit(ENDPOINT, FAKE_PATH).state)
+
+        response = mock.Mock(status_code=503)
+        self._fail(breaker, APIError('unavailable', response=response))
+        self.assertEqual(OPEN, breaker.circuit(ENDPOINT, FAKE_PATH).state)
+
+    def test_latency(self):
+        breaker = CircuitBreaker(failure_threshold=1, latency_threshold=10)
+
+        with breaker.guard(ENDPOINT, FAKE_PATH):
+            self.now += 11
+        self.assertEqual(OPEN, breaker.circuit(ENDPOINT, FAKE_PATH).state)
+
+    def test_half_open(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+        circuit = breaker.circuit(ENDPOINT, FAKE_PATH)
+
+        self._fail(breaker, HTTPError('timeout'))
+        self.now += 31
+
+        # failed probe opens the circuit again
+        self._fail(breaker, HTTPError('timeout'))
+        self.assertEqual(OPEN, circuit.state)
+        self.assertRaises(CircuitOpenError, circuit.before)
+
+        # only one probe at a time
+        self.now += 31
+        ticket = circuit.before()
+        self.assertEqual(HALF_OPEN, circuit.state)
+        self.assertRaises(CircuitOpenError, circuit.before)
+
+        # successful probe closes it
+        circuit.success(ticket)
+        self.assertEqual(CLOSED, circuit.state)
+        with breaker.guard(ENDPOINT, FAKE_PATH):
+            pass
+        self.assertEqual(CLOSED, circuit.state)
+
+    def test_stale_calls(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+        circuit = breaker.circuit(ENDPOINT, FAKE_PATH)
+
+        # a slow call admitted while closed...
+        stale = breaker.guard(ENDPOINT, FAKE_PATH)
+        stale.__enter__()
+
+        # ...finishes after the circuit opened: it does not close it
+        self._fail(breaker, HTTPError('timeout'))
+        self._fail(breaker, HTTPError('timeout'))
+        self.assertEqual(OPEN, circuit.state)
+        stale.__exit__(None, None, None)
+        self.assertEqual(OPEN, circuit.state)
+        self.assertRaises(CircuitOpenError, circuit.before)
+
+        # a probe closes it, and a late failure from before is ignored
+        self.now += 31
+        with breaker.guard(ENDPOINT, FAKE_PATH):
+            pass
+        stale = breaker.guard(ENDPOINT, FAKE_PATH)
+        stale.__enter__()
+        self._fail(breaker, HTTPError('timeout'))
+        self._fail(breaker, HTTPError('timeout'))
+        self.now += 31
+        with breaker.guard(ENDPOINT, FAKE_PATH):
+            pass
+        self.assertEqual(CLOSED, circuit.state)
+        self.assertFalse(stale.__exit__(HTTPError, HTTPError('timeout'), None))
+        self.assertEqual(0, circuit.failures)
+
+    @mock.patch('linxo.client.OAuth2Session.request')
+    def test_client(self, m_req):
+        breaker = CircuitBreaker(failure_threshold=2)
+        api = Client(ENDPOINT, CLIENT_ID, CLIENT_SECRET, circuit_breaker=breaker)
+
+        m_req.side_effect = requests.RequestException
+        self.assertRaises(HTTPError, api.get, '/accounts/1/transactions')
+        self.assertRaises(HTTPError, api.get, '/accounts/2/transactions', page=3)
+        self.assertRaises(CircuitOpenError, api.get, '/accounts/3/transactions')
+        self.assertEqual(2, m_req.call_count)
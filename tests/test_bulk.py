@@ -0,0 +1,92 @@
+# -*- encoding: utf-8 -*-
+
+import unittest
+import mock
+import threading
+from time import sleep
+
+from linxo.client import Client
+from linxo.bulk import BulkWriter, Operation, SUCCESS, FAILED, SKIPPED
+from linxo.exceptions import APIError, InvalidCredentials
+
+
+class FakeClient(object):
+    def __init__(self, fail=(), concurrent=None):
+        self.fail = fail
+        self.lock = threading.Lock()
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        # Set once ``concurrent`` calls are in flight at the same time
+        self.concurrent = concurrent
+        self.overlapped = threading.Event()
+
+    def call(self, method, path, data=None):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            if self.in_flight == self.concurrent:
+                self.overlapped.set()
+        if self.concurrent is not None:
+            # Hold calls until they overlap, or give up so that the test fails
+            self.overlapped.wait(5)
+        else:
+            sleep(0.002)
+        with self.lock:
+            self.in_flight -= 1
+            self.calls.append((method, path))
+        if path in self.fail:
+            raise InvalidCredentials('scope users_create is missing')
+        return {'path': path}
+
+
+class testBulkWriter(unittest.TestCase):
+    def test_run(self):
+        client = FakeClient(fail=['/users/2'])
+        operations = [
+            Operation('POST', '/users/1', {'email': 'one@example.com'}, key='1'),
+            Operation('POST', '/users/2', {'email': 'two@example.com'}, key='2'),
+            ('PUT', '/users/2/profile', {'name': 'two'}, '2'),
+            Operation('PUT', '/users/1/profile', {'name': 'one'}, key='1'),
+            Operation('DELETE', '/accounts/3'),
+        ]
+        report = BulkWriter(client, max_in_flight=4).run(iter(operations))
+
+        self.assertEqual(5, len(report))
+        self.assertFalse(report.ok)
+        self.assertEqual([0, 1, 2, 3, 4], [item.index for item in report])
+        self.assertEqual([SUCCESS, FAILED, SKIPPED, SUCCESS, SUCCESS],
+                         [item.status for item in report])
+        self.assertEqual({'path': '/users/1/profile'}, report.items[3].result)
+        self.assertTrue(isinstance(report.failures[0].error, APIError))
+        self.assertTrue(report.skipped[0].error is report.failures[0].error)
+
+        # ordering by key
+        calls = client.calls
+        self.assertTrue(calls.index(('POST', '/users/1')) < calls.index(('PUT', '/users/1/profile')))
+        self.assertFalse(('PUT', '/users/2/profile') in client.calls)
+
+    def test_max_in_flight(self):
+        client = FakeClient(concurrent=5)
+        operations = (Operation('DELETE', '/accounts/%d' % i) for i in range(50))
+        report = BulkWriter(client, max_in_flight=5).run(operations)
+
+        self.assertTrue(report.ok)
+        self.assertEqual(50, len(report.successes))
+        self.assertTrue(client.overlapped.is_set())
+        self.assertTrue(client.max_in_flight <= 5)
+
+    def test_same_key(self):
+        client = FakeClient()
+        operations = [Operation('PUT', '/users/1', {'step': i}, key='1') for i in range(20)]
+        BulkWriter(client, max_in_flight=5).run(operations)
+
+        self.assertEqual(1, client.max_in_flight)
+
+    @mock.patch('linxo.client.Client.call')
+    def test_client(self, m_call):
+        api = Client('prod', 'fake client_id', 'fake client_secret')
+        report = api.bulk([Operation('POST', '/users', {'email': 'one@example.com'})])
+
+        self.assertTrue(report.ok)
+        m_call.assert_called_once_with('POST', '/users', {'email': 'one@example.com'})
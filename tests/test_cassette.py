@@ -0,0 +1,144 @@
+# -*- encoding: utf-8 -*-
+
+import unittest
+import mock
+import json
+import os
+import shutil
+import tempfile
+
+from requests.models import Response
+
+from linxo.client import Client
+from linxo.cassette import Cassette
+from linxo.exceptions import CassetteError
+
+CLIENT_ID = 'fake client_id'
+CLIENT_SECRET = 'fake client_secret'
+REFRESH_TOKEN = 'fake refresh_token'
+ENDPOINT = 'prod'
+API_URL = 'https://api.linxo.com/v2'
+AUTH_URL = 'https://auth.linxo.com'
+
+TOKEN = {
+    'access_token': 'recorded access_token',
+    'refresh_token': 'recorded refresh_token',
+    'token_type': 'Bearer',
+    'expires_in': 3600,
+}
+ACCOUNTS = [{'id': '1', 'name': 'Compte courant'}]
+
+
+def fake_send(request, **kwargs):
+    """Pretend to be Linxo for the requests sent through the HTTP adapter."""
+    response = Response()
+    response.status_code = 200
+    response.reason = 'OK'
+    response.headers['Content-Type'] = 'application/json'
+    response.headers['Content-Length'] = '42'
+    if request.url == AUTH_URL + '/token':
+        response._content = json.dumps(TOKEN).encode('utf-8')
+    else:
+        response._content = json.dumps(ACCOUNTS).encode('utf-8')
+    return response
+
+
+class testCassette(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'test.cassette')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def record(self):
+        token_updater = mock.Mock()
+        with mock.patch('requests.adapters.HTTPAdapter.send', side_effect=fake_send):
+            with Cassette(self.path, mode='record') as cassette:
+                api = Client(ENDPOINT, CLIENT_ID, CLIENT_SECRET, REFRESH_TOKEN,
+                             token_updater=token_updater, cassette=cassette)
+                self.assertEqual(ACCOUNTS, api.get('/accounts', page=1))
+                self.assertEqual(ACCOUNTS, api.get('/accounts', page=2))
+        self.assertEqual(1, token_updater.call_count)
+
+    def test_record(self):
+        self.record()
+
+        cassette = Cassette(self.path)
+        token_key = 'POST ' + AUTH_URL + '/token'
+        self.assertEqual(1, len(cassette._index[token_key]))
+        self.assertEqual(1, len(cassette._index['GET ' + API_URL + '/accounts?page=1']))
+        self.assertEqual(1, len(cassette._index['GET ' + API_URL + '/accounts?page=2']))
+
+        interaction = cassette._index[token_key][0]
+        self.assertEqual(200, interaction['status'])
+        self.assertEqual({'Content-Type': 'application/json'}, interaction['headers'])
+
+    def test_record_closed(self):
+        with mock.patch('requests.adapters.HTTPAdapter.send', side_effect=fake_send):
+            with Cassette(self.path, mode='record') as cassette:
+                api = Client(ENDPOINT, CLIENT_ID, CLIENT_SECRET, REFRESH_TOKEN,
+                             token_updater=mock.Mock(), cassette=cassette)
+                api.get('/accounts', page=1)
+            self.assertRaises(CassetteError, api.get, '/accounts', page=2)
+
+        # the recording is kept
+        cassette = Cassette(self.path)
+        self.assertEqual(1, len(cassette._index['GET ' + API_URL + '/accounts?page=1']))
+
+    @mock.patch('linxo.client.config')
+    def test_replay(self, m_config):
+        self.record()
+
+        with mock.patch('requests.adapters.HTTPAdapter.send') as m_send:
+            api = Client(ENDPOINT, CLIENT_ID, CLIENT_SECRET, REFRESH_TOKEN,
+                         cassette=Cassette(self.path))
+            self.assertEqual(ACCOUNTS, api.get('/accounts', page=2))
+            self.assertEqual(ACCOUNTS, api.get('/accounts', page=1))
+            self.assertFalse(m_send.called)
+
+        # recorded token is used, but never saved to configuration
+        self.assertEqual('recorded access_token', api._session.token['access_token'])
+        self.assertFalse(m_config.write.called)
+
+        # each interaction is only replayed once
+        self.assertRaises(CassetteError, api.get, '/accounts', page=1)
+
+    @mock.patch('linxo.cassette.sleep')
+    def test_replay_latency(self, m_sleep):
+        self.record()
+
+        api = Client(ENDPOINT, CLIENT_ID, CLIENT_SECRET, REFRESH_TOKEN,
+                     token_updater=mock.Mock(),
+                     cassette=Cassette(self.path, latency=2))
+        api.get('/accounts', page=1)
+        self.assertEqual(2, m_sleep.call_count)
+
+    def test_invalid(self):
+        self.assertRaises(CassetteError, Cassette, self.path, mode='rewind')
+
+        # missing file
+        self.assertRaises(CassetteError, Cassette, self.path)
+
+        # not gzip
+        with open(self.path, 'wb') as f:
+            f.write(b'{"version": 1}\n')
+        self.assertRaises(CassetteError, Cassette, self.path)
+
+        # truncated
+        self.record()
+        with open(self.path, 'rb') as f:
+            content = f.read()
+        with open(self.path, 'wb') as f:
+            f.write(content[:len(content) // 2])
+        self.assertRaises(CassetteError, Cassette, self.path)
+
+    def test_replay_warmup(self):
+        self.record()
+
+        api = Client(ENDPOINT, CLIENT_ID, CLIENT_SECRET, REFRESH_TOKEN,
+                     token_updater=mock.Mock(), cassette=Cassette(self.path))
+        timings = api.warmup(connections=4)
+        self.assertEqual(0, timings[API_URL])
+        self.assertTrue('token' in timings)
+        self.assertEqual(ACCOUNTS, api.get('/accounts', page=1))
@@ -3,6 +3,7 @@
 import unittest
 import mock
 import json
+import socket
 import requests
 
 from linxo.client import Client
@@ -134,40 +135,40 @@ class testClient(unittest.TestCase):
         # basic test
         api = Client(ENDPOINT, CLIENT_ID, CLIENT_SECRET)
         self.assertEqual(m_call.return_value, api.get(FAKE_URL))
-        m_call.assert_called_once_with('GET', FAKE_URL, None)
+        m_call.assert_called_once_with('GET', FAKE_URL, None, timeout=None)
 
         # append query string
         m_call.reset_mock()
         api = Client(ENDPOINT, CLIENT_ID, CLIENT_SECRET)
         self.assertEqual(m_call.return_value, api.get(FAKE_URL, param="test"))
-        m_call.assert_called_once_with('GET', FAKE_URL + '?param=test', None)
+        m_call.assert_called_once_with('GET', FAKE_URL + '?param=test', None, timeout=None)
 
         # append to existing query string
         m_call.reset_mock()
         api = Client(ENDPOINT, CLIENT_ID, CLIENT_SECRET)
         self.assertEqual(m_call.return_value, api.get(FAKE_URL + '?query=string', param="test"))
-        m_call.assert_called_once_with('GET', FAKE_URL + '?query=string&param=test', None)
+        m_call.assert_called_once_with('GET', FAKE_URL + '?query=string&param=test', None, timeout=None)
 
         # boolean arguments
         m_call.reset_mock()
         api = Client(ENDPOINT, CLIENT_ID, CLIENT_SECRET)
         self.assertEqual(m_call.return_value, api.get(FAKE_URL + '?query=string', checkbox=True))
-        m_call.assert_called_once_with('GET', FAKE_URL + '?query=string&checkbox=true', None)
+        m_call.assert_called_once_with('GET', FAKE_URL + '?query=string&checkbox=true', None, timeout=None)
 
         # keyword calling convention
         m_call.reset_mock()
         api = Client(ENDPOINT, CLIENT_ID, CLIENT_SECRET)
         self.assertEqual(m_call.return_value, api.get(FAKE_URL, _from="start", to="end"))
         try:
-            m_call.assert_called_once_with('GET', FAKE_URL + '?to=end&from=start', None)
+            m_call.assert_called_once_with('GET', FAKE_URL + '?to=end&from=start', None, timeout=None)
         except Exception:
-            m_call.assert_called_once_with('GET', FAKE_URL + '?from=start&to=end', None)
+            m_call.assert_called_once_with('GET', FAKE_URL + '?from=start&to=end', None, timeout=None)
 
     @mock.patch.object(Client, 'call')
     def test_delete(self, m_call):
         api = Client(ENDPOINT, CLIENT_ID, CLIENT_SECRET)
         self.assertEqual(m_call.return_value, api.delete(FAKE_URL))
-        m_call.assert_called_once_with('DELETE', FAKE_URL, None)
+        m_call.assert_called_once_with('DELETE', FAKE_URL, None, timeout=None)
 
     @mock.patch.object(Client, 'call')
     def test_post(self, m_call):
@@ -180,7 +181,7 @@ class testClient(unittest.TestCase):
 
         api = Client(ENDPOINT, CLIENT_ID, CLIENT_SECRET)
         self.assertEqual(m_call.return_value, api.post(FAKE_URL, **PAYLOAD))
-        m_call.assert_called_once_with('POST', FAKE_URL, PAYLOAD)
+        m_call.assert_called_once_with('POST', FAKE_URL, PAYLOAD, timeout=None)
 
     @mock.patch.object(Client, 'call')
     def test_put(self, m_call):
@@ -193,7 +194,7 @@ class testClient(unittest.TestCase):
 
         api = Client(ENDPOINT, CLIENT_ID, CLIENT_SECRET)
         self.assertEqual(m_call.return_value, api.put(FAKE_URL, **PAYLOAD))
-        m_call.assert_called_once_with('PUT', FAKE_URL, PAYLOAD)
+        m_call.assert_called_once_with('PUT', FAKE_URL, PAYLOAD, timeout=None)
 
     # test core function
 
@@ -263,3 +264,39 @@ class testClient(unittest.TestCase):
         api = Client(ENDPOINT, CLIENT_ID, CLIENT_SECRET)
         r = api.raw_call(FAKE_METHOD, FAKE_PATH, None)
         self.assertEqual(r.txt, "Let's assume requests will return this")
+
+    @mock.patch('linxo.client.socket.getaddrinfo')
+    @mock.patch('linxo.client.OAuth2Session.refresh_token')
+    def test_warmup(self, m_refresh, m_dns):
+        token_updater = mock.Mock()
+        api = Client(ENDPOINT, CLIENT_ID, CLIENT_SECRET, token_updater=token_updater)
+
+        m_pool = mock.patch('linxo.client.HTTPAdapter.get_connection_with_tls_context').start()
+        self.addCleanup(mock.patch.stopall)
+        pool = m_pool.return_value
+        pool._get_conn.side_effect = lambda: mock.Mock(sock=None)
+        timings = api.warmup(connections=12)
+
+        self.assertEqual(set([API_URL, AUTH_URL, 'token']), set(timings))
+        self.assertEqual([mock.call('api.linxo.com', 443, 0, mock.ANY),
+                          mock.call('auth.linxo.com', 443, 0, mock.ANY)], m_dns.call_args_list)
+        self.assertEqual(13, pool._get_conn.call_count)
+        self.assertEqual(13, pool._put_conn.call_count)
+        for call in pool._put_conn.call_args_list:
+            call[0][0].connect.assert_called_once_with()
+        self.assertEqual(12, api._session.get_adapter(API_URL)._pool_maxsize)
+
+        m_refresh.assert_called_once_with(AUTH_URL + '/token', timeout=TIMEOUT)
+        token_updater.assert_called_once_with(m_refresh.return_value)
+
+        # failures
+        m_dns.side_effect = socket.gaierror()
+        self.assertRaises(HTTPError, api.warmup)
+        m_dns.side_effect = None
+        pool._get_conn.side_effect = lambda: mock.Mock(sock=None, **{'connect.side_effect': socket.error()})
+        self.assertRaises(HTTPError, api.warmup)
+        pool._get_conn.side_effect = lambda: mock.Mock(sock=None)
+        m_refresh.side_effect = requests.RequestException()
+        with mock.patch('linxo.client.logging') as m_logging:
+            api.warmup_async().join()
+            self.assertEqual(1, m_logging.exception.call_count)
@@ -0,0 +1,118 @@
+# -*- encoding: utf-8 -*-
+
+import unittest
+import mock
+import threading
+import requests
+
+from linxo.client import Client
+from linxo.deadline import Deadline, current
+from linxo.exceptions import DeadlineExceeded, HTTPError
+
+CLIENT_ID = 'fake client_id'
+CLIENT_SECRET = 'fake client_secret'
+ENDPOINT = 'prod'
+API_URL = 'https://api.linxo.com/v2'
+
+FAKE_PATH = '/unit/test'
+
+TIMEOUT = 180
+
+
+class testDeadline(unittest.TestCase):
+    def setUp(self):
+        self.now = 1000.0
+        self.time_patch = mock.patch('linxo.deadline.monotonic', side_effect=lambda: self.now)
+        self.time_patch.start()
+
+    def tearDown(self):
+        self.time_patch.stop()
+
+    def test_deadline(self):
+        self.assertTrue(current() is None)
+        with Deadline(10) as deadline:
+            self.assertTrue(current() is deadline)
+            self.assertEqual(10, deadline.remaining())
+            self.assertEqual(10, deadline.clip(None))
+            self.assertEqual(5, deadline.clip(5))
+            self.assertEqual((5, 10), deadline.clip((5, 180)))
+            deadline.check()
+
+            self.now += 11
+            self.assertTrue(deadline.expired)
+            self.assertEqual(0, deadline.remaining())
+            self.assertRaises(DeadlineExceeded, deadline.check)
+            self.assertRaises(DeadlineExceeded, deadline.clip, 5)
+            self.assertRaises(DeadlineExceeded, deadline.clip, None)
+        self.assertTrue(current() is None)
+
+        deadline = Deadline(10)
+        deadline.cancel()
+        self.assertRaises(DeadlineExceeded, deadline.clip, (5, 180))
+
+    def test_nested(self):
+        with Deadline(10) as outer:
+            with Deadline(60) as inner:
+                self.assertTrue(current() is inner)
+                self.assertEqual(10, inner.remaining())
+                outer.cancel()
+                self.assertRaises(DeadlineExceeded, inner.check)
+                self.assertTrue(inner.cancelled)
+            self.assertTrue(current() is outer)
+
+    def test_sleep(self):
+        deadline = Deadline(60)
+        self.assertFalse(deadline.sleep(0.001))
+
+        timer = threading.Timer(0.05, deadline.cancel)
+        timer.start()
+        self.assertTrue(deadline.sleep(30))
+        timer.join()
+
+    def test_wrap(self):
+        seen = []
+        deadline = Deadline(10)
+        thread = threading.Thread(target=deadline.wrap(lambda: seen.append(current())))
+        thread.start()
+        thread.join()
+        self.assertEqual([deadline], seen)
+
+    @mock.patch('linxo.client.OAuth2Session.request')
+    def test_client(self, m_req):
+        m_res = m_req.return_value
+        m_res.status_code = 200
+        api = Client(ENDPOINT, CLIENT_ID, CLIENT_SECRET)
+
+        # per call override
+        api.get(FAKE_PATH, _timeout=5)
+        m_req.assert_called_once_with('GET', API_URL + FAKE_PATH, headers={},
+                                      data='', timeout=5)
+        m_req.reset_mock()
+
+        with Deadline(30) as deadline:
+            api.delete(FAKE_PATH)
+            m_req.assert_called_once_with('DELETE', API_URL + FAKE_PATH, headers={},
+                                          data='', timeout=30)
+            m_req.reset_mock()
+
+            api.post(FAKE_PATH, _timeout=(3, 60), key='value')
+            self.assertEqual((3, 30), m_req.call_args[1]['timeout'])
+            m_req.reset_mock()
+
+            # request timed out because of the deadline
+            def timeout(*args, **kwargs):
+                self.now += 30
+                raise requests.Timeout()
+            m_req.side_effect = timeout
+            self.assertRaises(DeadlineExceeded, api.get, FAKE_PATH)
+            m_req.reset_mock()
+
+            # outstanding calls are not sent
+            self.assertRaises(DeadlineExceeded, api.get, FAKE_PATH)
+            self.assertFalse(m_req.called)
+
+        # no deadline anymore
+        m_req.side_effect = requests.Timeout()
+        self.assertRaises(HTTPError, api.get, FAKE_PATH)
+        self.assertEqual(TIMEOUT, m_req.call_args[1]['timeout'])
+        self.assertFalse(deadline.cancelled)
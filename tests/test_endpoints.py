@@ -0,0 +1,87 @@
+# -*- encoding: utf-8 -*-
+
+import unittest
+import mock
+
+from linxo.client import Client
+from linxo.breaker import CircuitBreaker
+from linxo.endpoints import API, Endpoint, match_template
+from linxo.exceptions import CircuitOpenError, HTTPError
+from linxo.metrics import Metrics
+
+CLIENT_ID = 'fake client_id'
+CLIENT_SECRET = 'fake client_secret'
+ENDPOINT = 'prod'
+
+
+class testEndpoints(unittest.TestCase):
+    def test_endpoint(self):
+        endpoint = Endpoint('accounts.transactions', 'GET', '/accounts/{account_id}/transactions',
+                            ('start_date', 'page'))
+        self.assertEqual(('account_id',), endpoint.path_parameters)
+        self.assertEqual('/accounts/12%2F3/transactions', endpoint.path(('12/3',)))
+        self.assertRaises(TypeError, endpoint.path, ())
+        self.assertRaises(TypeError, endpoint.check, {'end_date': '2018-01-01'})
+        self.assertEqual('flag=true&page=2', endpoint.query_string({'page': 2, 'flag': True, 'skip': None}))
+
+    def test_resources(self):
+        api = Client(ENDPOINT, CLIENT_ID, CLIENT_SECRET)
+        for resource, methods in API.items():
+            for name in methods:
+                self.assertTrue(callable(getattr(getattr(api, resource), name)))
+        self.assertEqual('transactions', api.accounts.transactions.__name__)
+
+    @mock.patch.object(Client, 'call')
+    def test_calls(self, m_call):
+        api = Client(ENDPOINT, CLIENT_ID, CLIENT_SECRET)
+
+        self.assertEqual(m_call.return_value, api.accounts.list())
+        m_call.assert_called_once_with('GET', '/accounts', None, timeout=None,
+                                       template='/accounts')
+        m_call.reset_mock()
+
+        api.accounts.transactions(1234, start_date='2018-01-01', page=2, _timeout=10)
+        m_call.assert_called_once_with('GET', '/accounts/1234/transactions?page=2&start_date=2018-01-01',
+                                       None, timeout=10,
+                                       template='/accounts/{account_id}/transactions')
+        m_call.reset_mock()
+
+        api.users.create(email='jane@example.com', firstname=None)
+        m_call.assert_called_once_with('POST', '/users', {'email': 'jane@example.com'},
+                                       timeout=None, template='/users')
+        m_call.reset_mock()
+
+        api.connections.delete('42')
+        m_call.assert_called_once_with('DELETE', '/connections/42', None, timeout=None,
+                                       template='/connections/{connection_id}')
+
+        self.assertRaises(TypeError, api.accounts.transactions)
+        self.assertRaises(TypeError, api.accounts.list, unknown=1)
+
+    @mock.patch.object(Client, '_call')
+    def test_labels(self, m_call):
+        metrics = Metrics()
+        breaker = CircuitBreaker(failure_threshold=1)
+        api = Client(ENDPOINT, CLIENT_ID, CLIENT_SECRET, circuit_breaker=breaker, metrics=metrics)
+
+        api.accounts.transactions(1)
+        api.accounts.transactions(2)
+        api.get('/accounts/3/transactions')
+        m_call.side_effect = HTTPError('timeout')
+        self.assertRaises(HTTPError, api.accounts.transactions, 4)
+
+        # generic and typed calls share the same label and circuit
+        snapshot = metrics.snapshot()
+        self.assertEqual(['GET /accounts/{account_id}/transactions'], list(snapshot))
+        self.assertEqual(4, snapshot['GET /accounts/{account_id}/transactions']['count'])
+        self.assertEqual(1, snapshot['GET /accounts/{account_id}/transactions']['errors'])
+        self.assertEqual('open', breaker.circuit(ENDPOINT, '/accounts/{account_id}/transactions').state)
+        self.assertRaises(CircuitOpenError, api.get, '/accounts/5/transactions', page=2)
+
+    def test_match_template(self):
+        self.assertEqual('/accounts/{account_id}/transactions',
+                         match_template('/accounts/1234/transactions'))
+        self.assertEqual('/users/me', match_template('/users/me'))
+        self.assertEqual('/connections/{connection_id}/synchronizations',
+                         match_template('/connections/abc/synchronizations'))
+        self.assertEqual(None, match_template('/accounts/1234/balances'))
@@ -0,0 +1,189 @@
+# -*- encoding: utf-8 -*-
+
+import unittest
+import mock
+import csv
+import json
+import os
+import shutil
+import tempfile
+import threading
+from time import sleep
+
+from linxo import __main__ as cli
+from linxo import export
+from linxo.export import Exporter
+from linxo.exceptions import HTTPError
+
+ACCOUNTS = [{'id': str(i), 'name': 'account %d' % i} for i in range(3)]
+
+
+def transactions(account_id, count):
+    return [{'id': '%s-%d' % (account_id, i), 'account_id': account_id,
+             'amount': i, 'labels': ['label %d' % i]} for i in range(count)]
+
+
+TRANSACTIONS = {
+    '0': transactions('0', 5),
+    '1': transactions('1', 0),
+    '2': transactions('2', 4),
+}
+
+
+class FakeClient(object):
+    def __init__(self, fail=()):
+        self.fail = list(fail)
+        self.calls = []
+
+    def get(self, path, page, limit, **kwargs):
+        self.calls.append((path, page, kwargs.get('account_id')))
+        if (path, page, kwargs.get('account_id')) in self.fail:
+            self.fail.remove((path, page, kwargs.get('account_id')))
+            raise HTTPError('timeout')
+        if path == '/accounts':
+            rows = ACCOUNTS
+        else:
+            rows = TRANSACTIONS[kwargs['account_id']]
+        return rows[(page - 1) * limit:page * limit]
+
+
+class testExporter(unittest.TestCase):
+    def setUp(self):
+        self.output = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.output)
+
+    def read_jsonl(self, name):
+        with open(os.path.join(self.output, name)) as f:
+            return [json.loads(line) for line in f]
+
+    def test_jsonl(self):
+        client = FakeClient()
+        progress = Exporter(client, self.output, workers=2, page_size=2).run()
+
+        self.assertEqual(ACCOUNTS, self.read_jsonl('accounts.jsonl'))
+        for account_id, rows in TRANSACTIONS.items():
+            self.assertEqual(rows, self.read_jsonl('transactions-%s.jsonl' % account_id))
+        self.assertEqual(12, progress.rows)
+        self.assertEqual(4, progress.done)
+        self.assertEqual(4, progress.partitions)
+
+        # everything is done, nothing to fetch again
+        client = FakeClient()
+        Exporter(client, self.output, page_size=2).run()
+        self.assertEqual([], client.calls)
+
+    def test_resume(self):
+        client = FakeClient(fail=[('/transactions', 2, '2')])
+        exporter = Exporter(client, self.output, workers=1, page_size=2)
+        self.assertRaises(HTTPError, exporter.run)
+
+        # pages written but not checkpointed are written again
+        with open(os.path.join(self.output, 'transactions-2.jsonl'), 'a') as f:
+            f.write('{"partial": ')
+
+        self.assertEqual(TRANSACTIONS['0'], self.read_jsonl('transactions-0.jsonl'))
+        client.calls = []
+        Exporter(client, self.output, page_size=2).run()
+
+        self.assertEqual([('/transactions', 2, '2'), ('/transactions', 3, '2')], client.calls)
+        self.assertEqual(TRANSACTIONS['2'], self.read_jsonl('transactions-2.jsonl'))
+
+    def test_resume_accounts(self):
+        client = FakeClient(fail=[('/accounts', 2, None)])
+        exporter = Exporter(client, self.output, page_size=2)
+        self.assertRaises(HTTPError, exporter.run)
+        self.assertFalse(os.path.exists(os.path.join(self.output, 'transactions-0.jsonl')))
+
+        # accounts of the first page are not forgotten
+        client.calls = []
+        Exporter(client, self.output, page_size=2).run()
+        self.assertEqual(('/accounts', 2, None), client.calls[0])
+        self.assertEqual(ACCOUNTS, self.read_jsonl('accounts.jsonl'))
+        for account_id, rows in TRANSACTIONS.items():
+            self.assertEqual(rows, self.read_jsonl('transactions-%s.jsonl' % account_id))
+
+    def test_failure(self):
+        client = FakeClient(fail=[('/transactions', 1, '0')])
+        exporter = Exporter(client, self.output, workers=1, page_size=2)
+        self.assertRaises(HTTPError, exporter.run)
+
+        # the failed partition stops the others
+        self.assertEqual([('/transactions', 1, '0')],
+                         [call for call in client.calls if call[0] == '/transactions'])
+
+        client.calls = []
+        Exporter(client, self.output, page_size=2).run()
+        for account_id, rows in TRANSACTIONS.items():
+            self.assertEqual(rows, self.read_jsonl('transactions-%s.jsonl' % account_id))
+
+    def test_interrupt(self):
+        blocked, release = threading.Event(), threading.Event()
+
+        class SlowClient(FakeClient):
+            def get(self, path, page, limit, **kwargs):
+                if kwargs.get('account_id') == '0' and page == 2:
+                    blocked.set()
+                    release.wait(5)
+                return FakeClient.get(self, path, page, limit, **kwargs)
+
+        def interrupt(*args, **kwargs):
+            # Ctrl-C while waiting for the partitions
+            blocked.wait(5)
+            raise KeyboardInterrupt
+
+        client = SlowClient()
+        exporter = Exporter(client, self.output, workers=1, page_size=2)
+        with mock.patch('linxo.export.as_completed', side_effect=interrupt):
+            self.assertRaises(KeyboardInterrupt, exporter.run)
+
+        # returns without waiting for the partitions, which stop after their page
+        release.set()
+        for _ in range(500):
+            if exporter._checkpoint['partitions']['transactions-0'].get('page') == 3:
+                break
+            sleep(0.01)
+        sleep(0.05)
+        self.assertEqual([('/transactions', 1, '0'), ('/transactions', 2, '0')],
+                         [call for call in client.calls if call[0] == '/transactions'])
+
+        client.calls = []
+        Exporter(client, self.output, page_size=2).run()
+        self.assertEqual(('/transactions', 3, '0'), client.calls[0])
+        for account_id, rows in TRANSACTIONS.items():
+            self.assertEqual(rows, self.read_jsonl('transactions-%s.jsonl' % account_id))
+
+    def test_csv(self):
+        Exporter(FakeClient(), self.output, format='csv', page_size=2).run()
+
+        with open(os.path.join(self.output, 'transactions-0.csv')) as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual(5, len(rows))
+        self.assertEqual({'id': '0-4', 'account_id': '0', 'amount': '4',
+                          'labels': '["label 4"]'}, rows[4])
+
+    @unittest.skipIf(export.pyarrow is None, 'pyarrow is not installed')
+    def test_parquet(self):
+        import pyarrow.parquet
+
+        Exporter(FakeClient(), self.output, format='parquet', page_size=2).run()
+        table = pyarrow.parquet.read_table(os.path.join(self.output, 'transactions-0.parquet'))
+        self.assertEqual(TRANSACTIONS['0'], table.to_pylist())
+
+    def test_invalid_format(self):
+        self.assertRaises(ValueError, Exporter, FakeClient(), self.output, format='xls')
+
+    @mock.patch('linxo.__main__.Client')
+    def test_main(self, m_client):
+        m_client.return_value = FakeClient()
+        code = cli.main(['--endpoint', 'sandbox', 'export', '--output', self.output,
+                         '--page-size', '2', '--start-date', '2018-01-01'])
+
+        self.assertEqual(0, code)
+        m_client.assert_called_once_with(endpoint='sandbox', config_file=None, debug=False)
+        self.assertEqual(TRANSACTIONS['0'], self.read_jsonl('transactions-0.jsonl'))
+
+        m_client.return_value = FakeClient(fail=[('/accounts', 1, None)])
+        shutil.rmtree(self.output)
+        self.assertEqual(1, cli.main(['export', '--output', self.output]))
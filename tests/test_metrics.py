@@ -0,0 +1,28 @@
+# -*- encoding: utf-8 -*-
+
+import unittest
+
+from linxo.metrics import Metrics
+
+
+class testMetrics(unittest.TestCase):
+    def test_record(self):
+        metrics = Metrics()
+        metrics.record('get', '/accounts', 0.5)
+        metrics.record('GET', '/accounts', 1.5, error=ValueError())
+
+        self.assertEqual({'GET /accounts': {'count': 2, 'errors': 1, 'seconds': 2.0}},
+                         metrics.snapshot())
+
+    def test_merge(self):
+        metrics = Metrics()
+        metrics.record('GET', '/accounts', 1)
+        metrics.merge({
+            'GET /accounts': {'count': 2, 'errors': 1, 'seconds': 3.0},
+            'POST /users': {'count': 1, 'errors': 0, 'seconds': 0.5},
+        })
+
+        self.assertEqual({
+            'GET /accounts': {'count': 3, 'errors': 1, 'seconds': 4.0},
+            'POST /users': {'count': 1, 'errors': 0, 'seconds': 0.5},
+        }, metrics.snapshot())
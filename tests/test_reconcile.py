@@ -0,0 +1,154 @@
+# -*- encoding: utf-8 -*-
+
+import unittest
+import os
+import shutil
+import tempfile
+
+from linxo.reconcile import (
+    TransactionIndex, Deletion, NEW, UNCHANGED, MODIFIED, DUPLICATE,
+)
+
+
+def transaction(id, amount=-4.5, label='CB CAFE DU COIN', date='2018-06-01'):
+    return {'id': id, 'account_id': '1', 'date': date, 'amount': amount,
+            'currency': 'EUR', 'label': label}
+
+
+class testTransactionIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.index = TransactionIndex(os.path.join(self.tmpdir, 'index.db'))
+
+    def tearDown(self):
+        self.index.close()
+        shutil.rmtree(self.tmpdir)
+
+    def test_fingerprint(self):
+        index = self.index
+        self.assertEqual(index.fingerprint(transaction('1')),
+                         index.fingerprint(transaction('2', amount=-4.50, label=' cb  cafe du coin')))
+        self.assertNotEqual(index.fingerprint(transaction('1')),
+                            index.fingerprint(transaction('1', amount=-4.6)))
+        self.assertEqual(index.digest(transaction('1')), index.digest(transaction('2')))
+        self.assertNotEqual(index.digest(transaction('1')), index.digest(transaction('1', label='CAFE')))
+
+    def test_runs(self):
+        with self.index.run(scope='1') as run:
+            self.assertEqual(NEW, run.add(transaction('1')))
+            # same operation twice the same day is not a duplicate
+            self.assertEqual(NEW, run.add(transaction('2')))
+            self.assertEqual(NEW, run.add(transaction('3', amount=10)))
+            self.assertEqual(NEW, run.add(transaction('4', amount=20)))
+            # overlapping pull
+            self.assertEqual(DUPLICATE, run.add(transaction('3', amount=10)))
+            self.assertEqual([], list(run.deletions()))
+
+        # persisted across runs
+        self.index.close()
+        self.index = TransactionIndex(os.path.join(self.tmpdir, 'index.db'))
+
+        with self.index.run(scope='1') as run:
+            self.assertEqual(UNCHANGED, run.add(transaction('1')))
+            self.assertEqual(MODIFIED, run.add(transaction('2', label='CB CAFE DU COIN PARIS')))
+            # connection re-synchronized: transaction 4 came back as 5
+            self.assertEqual(DUPLICATE, run.add(transaction('5', amount=20)))
+            self.assertEqual(NEW, run.add(transaction('6', amount=30)))
+            self.assertEqual([Deletion('3', None), Deletion('4', '5')], list(run.deletions()))
+        self.assertEqual(2, run.counts['deleted'])
+
+        # duplicate replaced the deleted transaction
+        with self.index.run(scope='1') as run:
+            self.assertEqual(UNCHANGED, run.add(transaction('1')))
+            self.assertEqual(UNCHANGED, run.add(transaction('2', label='CB CAFE DU COIN PARIS')))
+            self.assertEqual(UNCHANGED, run.add(transaction('5', amount=20)))
+            self.assertEqual(UNCHANGED, run.add(transaction('6', amount=30)))
+            self.assertEqual([], list(run.deletions()))
+
+    def test_new_before_original(self):
+        with self.index.run(scope='1') as run:
+            run.add(transaction('1'))
+
+        # new identical transaction listed before the known one
+        with self.index.run(scope='1') as run:
+            self.assertEqual(DUPLICATE, run.add(transaction('2')))
+            self.assertEqual(UNCHANGED, run.add(transaction('1')))
+            self.assertEqual(['2'], list(run.additions()))
+            self.assertEqual([], list(run.deletions()))
+        self.assertEqual(1, run.counts[NEW])
+        self.assertEqual(0, run.counts[DUPLICATE])
+
+        with self.index.run(scope='1') as run:
+            self.assertEqual(UNCHANGED, run.add(transaction('1')))
+            self.assertEqual(UNCHANGED, run.add(transaction('2')))
+            self.assertEqual([], list(run.additions()))
+
+    def test_identical_transactions(self):
+        # two identical coffees the same day
+        with self.index.run(scope='1') as run:
+            self.assertEqual(NEW, run.add(transaction('1')))
+            self.assertEqual(NEW, run.add(transaction('2')))
+
+        # a third one, listed first
+        with self.index.run(scope='1') as run:
+            self.assertEqual(DUPLICATE, run.add(transaction('3')))
+            self.assertEqual(UNCHANGED, run.add(transaction('1')))
+            self.assertEqual(UNCHANGED, run.add(transaction('2')))
+            self.assertEqual(['3'], list(run.additions()))
+            self.assertEqual([], list(run.deletions()))
+
+        with self.index.run(scope='1') as run:
+            self.assertEqual([UNCHANGED] * 3, [run.add(transaction(i)) for i in '312'])
+
+        # re-synchronized: 1 came back as 4, matched to 2 once 1 is missing
+        with self.index.run(scope='1') as run:
+            self.assertEqual(DUPLICATE, run.add(transaction('4')))
+            self.assertEqual(UNCHANGED, run.add(transaction('3')))
+            self.assertEqual(UNCHANGED, run.add(transaction('2')))
+            self.assertEqual([], list(run.additions()))
+            self.assertEqual([Deletion('1', '4')], list(run.deletions()))
+
+    def test_scopes_and_failures(self):
+        with self.index.run(scope='1') as run:
+            run.add(transaction('1'))
+
+        # other scopes are not deleted
+        with self.index.run(scope='2') as run:
+            run.add(transaction('2', amount=1))
+        with self.index.run(scope='1') as run:
+            self.assertEqual(UNCHANGED, run.add(transaction('1')))
+
+        # failed pull deletes nothing
+        try:
+            with self.index.run(scope='1') as run:
+                raise ValueError()
+        except ValueError:
+            pass
+        with self.index.run(scope='1') as run:
+            self.assertEqual(UNCHANGED, run.add(transaction('1')))
+
+    def test_failed_run(self):
+        with self.index.run(scope='1') as run:
+            run.add(transaction('1'))
+            run.add(transaction('2', amount=1))
+
+        # failed pull leaves the index untouched
+        try:
+            with self.index.run(scope='1') as run:
+                self.assertEqual(MODIFIED, run.add(transaction('1', label='CAFE')))
+                self.assertEqual(DUPLICATE, run.add(transaction('3', amount=1)))
+                for i in range(4, 7):
+                    self.assertEqual(NEW, run.add(transaction(str(i), amount=i)))
+                raise ValueError()
+        except ValueError:
+            pass
+
+        # so transactions the caller did not store are reported again
+        self.index.close()
+        self.index = TransactionIndex(os.path.join(self.tmpdir, 'index.db'))
+        with self.index.run(scope='1') as run:
+            self.assertEqual(MODIFIED, run.add(transaction('1', label='CAFE')))
+            self.assertEqual(DUPLICATE, run.add(transaction('3', amount=1)))
+            self.assertEqual([NEW, NEW, NEW],
+                             [run.add(transaction(str(i), amount=i)) for i in range(4, 7)])
+            self.assertEqual([Deletion('2', '3')], list(run.deletions()))
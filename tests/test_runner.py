@@ -0,0 +1,123 @@
+# -*- encoding: utf-8 -*-
+
+import unittest
+import mock
+import os
+import threading
+from time import time
+
+from linxo.client import Client
+from linxo.runner import ShardedRunner, SharedToken
+from linxo.exceptions import ResourceNotFoundError
+
+CLIENT_KWARGS = {
+    'endpoint': 'prod',
+    'client_id': 'fake client_id',
+    'client_secret': 'fake client_secret',
+    'refresh_token': 'fake refresh_token',
+}
+
+
+def refresh_token(token_url, refresh_token=None, timeout=None):
+    return {
+        'access_token': 'access_token of %d' % os.getpid(),
+        'refresh_token': 'refresh_token of %d' % os.getpid(),
+        'expires_at': time() + 3600,
+    }
+
+
+def save_token(token):
+    pass
+
+
+def task(client, shard):
+    if shard == 'missing':
+        raise ResourceNotFoundError('account not found')
+    client.token_store.ensure(client)
+    client.metrics.record('GET', '/accounts/{account_id}/transactions', 0.5)
+    for i in range(shard):
+        yield {'shard': shard, 'row': i, 'token': client._session.token['access_token']}
+
+
+class testShardedRunner(unittest.TestCase):
+    @mock.patch('linxo.client.OAuth2Session.refresh_token', side_effect=refresh_token)
+    def test_run(self, m_refresh):
+        kwargs = dict(CLIENT_KWARGS, token_updater=save_token)
+        runner = ShardedRunner(task, processes=3, client_kwargs=kwargs, batch_size=4,
+                               start_method='fork')
+        results = list(runner.run([5, 'missing', 10, 0, 7]))
+
+        self.assertEqual(22, len(results))
+        self.assertEqual(list(range(10)), sorted(row['row'] for shard, row in results if shard == 10))
+        self.assertEqual(set(['missing']), set(runner.errors))
+        self.assertTrue(isinstance(runner.errors['missing'], ResourceNotFoundError))
+
+        # a single refresh, shared by every worker
+        self.assertEqual(1, len(set(row['token'] for shard, row in results)))
+
+        snapshot = runner.metrics.snapshot()
+        self.assertEqual(4, snapshot['GET /accounts/{account_id}/transactions']['count'])
+
+
+class testSharedToken(unittest.TestCase):
+    @mock.patch('linxo.client.OAuth2Session.refresh_token')
+    def test_ensure(self, m_refresh):
+        state = {}
+        shared = SharedToken(state, threading.Lock())
+        token_updater = mock.Mock()
+        clients = [Client(token_updater=token_updater, token_store=shared, **CLIENT_KWARGS)
+                   for _ in range(3)]
+
+        m_refresh.return_value = {'access_token': 'first', 'refresh_token': 'rotated',
+                                  'expires_at': time() + 3600}
+        for client in clients:
+            shared.ensure(client)
+            self.assertEqual('first', client._session.token['access_token'])
+        m_refresh.assert_called_once_with(clients[0].token_url, refresh_token='fake refresh_token',
+                                          timeout=180)
+        token_updater.assert_called_once_with(m_refresh.return_value)
+
+        # token about to expire: refreshed with the rotated refresh token
+        state['token'] = dict(state['token'], expires_at=time() + 10)
+        clients[1]._session.token = state['token']
+        m_refresh.reset_mock()
+        m_refresh.return_value = {'access_token': 'second', 'refresh_token': 'rotated again',
+                                  'expires_at': time() + 3600}
+        shared.ensure(clients[1])
+        m_refresh.assert_called_once_with(clients[1].token_url, refresh_token='rotated',
+                                          timeout=180)
+
+        # other clients keep their valid token, and adopt the new one near expiry
+        shared.ensure(clients[2])
+        self.assertEqual('first', clients[2]._session.token['access_token'])
+        clients[2]._session.token = dict(clients[2]._session.token, expires_at=time() + 10)
+        shared.ensure(clients[2])
+        self.assertEqual('second', clients[2]._session.token['access_token'])
+        self.assertEqual(1, m_refresh.call_count)
+
+    def test_ensure_valid(self):
+        state = mock.MagicMock()
+        shared = SharedToken(state, mock.MagicMock())
+        client = Client(token_store=shared, **CLIENT_KWARGS)
+        client._session.token = {'access_token': 'valid', 'expires_at': time() + 3600}
+
+        # valid token: no round trip to the shared state
+        shared.ensure(client)
+        self.assertEqual([], state.mock_calls)
+        self.assertEqual([], shared.lock.mock_calls)
+
+    @mock.patch.object(Client, '_warmup_connections', return_value=0)
+    @mock.patch('linxo.client.OAuth2Session.refresh_token')
+    def test_warmup(self, m_refresh, m_connections):
+        shared = SharedToken({}, threading.Lock())
+        clients = [Client(token_updater=mock.Mock(), token_store=shared, **CLIENT_KWARGS)
+                   for _ in range(2)]
+        m_refresh.return_value = {'access_token': 'first', 'refresh_token': 'rotated',
+                                  'expires_at': time() + 3600}
+
+        # refreshed once under the shared lock, then adopted
+        for client in clients:
+            self.assertTrue('token' in client.warmup())
+            self.assertEqual('first', client._session.token['access_token'])
+        m_refresh.assert_called_once_with(clients[0].token_url, refresh_token='fake refresh_token',
+                                          timeout=180)
@@ -0,0 +1,167 @@
+# -*- encoding: utf-8 -*-
+
+import unittest
+import mock
+import threading
+from time import sleep, time
+
+from linxo.deadline import Deadline
+from linxo.sync import SyncOrchestrator, TIMEOUT, ERROR
+from linxo.exceptions import DeadlineExceeded, HTTPError, InvalidCredentials
+
+
+class FakeClient(object):
+    """Connections go through ``statuses`` one poll at a time."""
+    def __init__(self, statuses, fail_trigger=()):
+        self.statuses = dict((k, list(v)) for k, v in statuses.items())
+        self.fail_trigger = fail_trigger
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.posts = []
+        self.gets = []
+
+    def _enter(self):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        sleep(0.005)
+
+    def _exit(self):
+        with self.lock:
+            self.in_flight -= 1
+
+    def post(self, path):
+        self._enter()
+        try:
+            self.posts.append(path)
+            connection_id = path.split('/')[2]
+            if connection_id in self.fail_trigger:
+                raise InvalidCredentials('scope connections_sync is missing')
+            return {}
+        finally:
+            self._exit()
+
+    def get(self, path):
+        self._enter()
+        try:
+            self.gets.append(path)
+            connection_id = path.split('/')[2]
+            status = self.statuses[connection_id]
+            if len(status) > 1:
+                status = status.pop(0)
+            else:
+                status = status[0]
+            if isinstance(status, Exception):
+                raise status
+            return {'id': connection_id, 'status': status}
+        finally:
+            self._exit()
+
+
+class testSyncOrchestrator(unittest.TestCase):
+    def orchestrator(self, client, **kwargs):
+        options = {'initial_interval': 0.001, 'max_interval': 0.01}
+        options.update(kwargs)
+        return SyncOrchestrator(client, **options)
+
+    def test_sync(self):
+        client = FakeClient({
+            '1': ['RUNNING', 'RUNNING', 'SUCCESS'],
+            '2': ['FAILED'],
+            '3': ['RUNNING', HTTPError('timeout'), 'PARTIAL_SUCCESS'],
+        })
+        results = self.orchestrator(client).sync(['1', '2', '3'])
+
+        self.assertEqual('SUCCESS', results['1'].status)
+        self.assertEqual(3, results['1'].polls)
+        self.assertEqual({'id': '1', 'status': 'SUCCESS'}, results['1'].data)
+        self.assertEqual('FAILED', results['2'].status)
+        self.assertEqual('PARTIAL_SUCCESS', results['3'].status)
+        self.assertEqual(['/connections/1/synchronizations',
+                          '/connections/2/synchronizations',
+                          '/connections/3/synchronizations'], sorted(client.posts))
+
+    def test_errors(self):
+        client = FakeClient({
+            '1': [HTTPError('timeout')],
+            '2': ['SUCCESS'],
+        }, fail_trigger=['2'])
+        results = self.orchestrator(client, max_errors=2).sync(['1', '2'])
+
+        self.assertEqual(ERROR, results['1'].status)
+        self.assertTrue(isinstance(results['1'].error, HTTPError))
+        self.assertEqual(2, client.gets.count('/connections/1'))
+        self.assertEqual(ERROR, results['2'].status)
+        self.assertTrue(isinstance(results['2'].error, InvalidCredentials))
+        self.assertFalse('/connections/2' in client.gets)
+
+    def test_max_in_flight(self):
+        client = FakeClient(dict((str(i), ['RUNNING', 'SUCCESS']) for i in range(20)))
+        results = self.orchestrator(client, max_in_flight=3).sync([str(i) for i in range(20)])
+
+        self.assertEqual(20, len(results))
+        self.assertEqual(3, client.max_in_flight)
+
+    def test_timeout(self):
+        client = FakeClient({'1': ['RUNNING'], '2': ['SUCCESS']})
+        results = self.orchestrator(client).sync(['1', '2'], timeout=0.1)
+
+        self.assertEqual(TIMEOUT, results['1'].status)
+        self.assertEqual({'id': '1', 'status': 'RUNNING'}, results['1'].data)
+        self.assertEqual('SUCCESS', results['2'].status)
+
+    def test_start(self):
+        client = FakeClient({'1': ['SUCCESS']})
+        callback = mock.Mock()
+        thread = self.orchestrator(client).start(['1'], callback)
+        thread.join(5)
+
+        self.assertEqual(1, callback.call_count)
+        self.assertEqual('SUCCESS', callback.call_args[0][0].status)
+
+    def test_next_interval(self):
+        orchestrator = SyncOrchestrator(None, initial_interval=2, max_interval=5, backoff=2)
+        sync = mock.Mock(interval=2, status=None)
+
+        self.assertEqual(2, orchestrator._next_interval(sync, 'RUNNING'))
+        self.assertEqual(4, orchestrator._next_interval(sync, 'RUNNING'))
+        self.assertEqual(5, orchestrator._next_interval(sync, 'RUNNING'))
+        self.assertEqual(2, orchestrator._next_interval(sync, 'FETCHING'))
+
+    def test_deadline(self):
+        client = FakeClient({'1': ['RUNNING']})
+        with Deadline(0.1):
+            results = self.orchestrator(client).sync(['1'])
+        self.assertEqual(TIMEOUT, results['1'].status)
+
+        client = FakeClient({'1': ['RUNNING']})
+        with Deadline(60) as deadline:
+            thread = self.orchestrator(client).start(['1'], mock.Mock())
+            sleep(0.05)
+            deadline.cancel()
+            thread.join(5)
+        self.assertFalse(thread.is_alive())
+
+    def test_cancel(self):
+        # cancelling does not wait for the next poll
+        client = FakeClient({'1': ['RUNNING']})
+        callback = mock.Mock()
+        orchestrator = self.orchestrator(client, initial_interval=30, max_interval=60)
+        with Deadline(60) as deadline:
+            thread = orchestrator.start(['1'], callback)
+            sleep(0.05)
+            start = time()
+            deadline.cancel()
+            thread.join(5)
+        self.assertFalse(thread.is_alive())
+        self.assertTrue(time() - start < 1)
+        self.assertEqual(TIMEOUT, callback.call_args[0][0].status)
+
+    def test_trigger_deadline(self):
+        client = FakeClient({'1': ['SUCCESS']})
+        client.post = mock.Mock(side_effect=DeadlineExceeded('Deadline exceeded or cancelled'))
+        results = self.orchestrator(client).sync(['1'])
+
+        self.assertEqual(TIMEOUT, results['1'].status)
+        self.assertTrue(isinstance(results['1'].error, DeadlineExceeded))